@@ -0,0 +1,186 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from classEncoder import DEFAULT_ENCODER_PROFILE, ENCODER_PROFILES
+from comEngine import DEFAULT_SEGMENT_MODEL, SEGMENT_MODELS
+
+# Extensiones de video que se buscan dentro de un directorio
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi')
+
+
+# Expande directorios, patrones glob y archivos en una lista ordenada de videos
+def find_videos(inputs):
+    videos = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for name in sorted(os.listdir(item)):
+                if name.lower().endswith(VIDEO_EXTENSIONS):
+                    videos.append(os.path.join(item, name))
+        elif os.path.isfile(item):
+            videos.append(item)
+        else:
+            videos.extend(sorted(glob.glob(item)))
+    return list(dict.fromkeys(videos))
+
+
+# Ruta de salida dentro de output_dir: el video procesado o, en modo solo
+# análisis, la serie de tiempo del centro de masa con la extensión indicada
+def output_path_for(video_path, output_dir, series_format=None):
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    if series_format:
+        return os.path.join(output_dir, f"{stem}_com.{series_format}")
+    return os.path.join(output_dir, f"{stem}_procesado.mp4")
+
+
+# Trabajo de un proceso: procesa un video y devuelve sus estadísticas.
+# Se escribe primero en un .part para que un video a medias no cuente como terminado.
+def _run_job(video_path, output_path, peso_persona, options):
+    from master import CenterOfMassDetector
+    from classCache import LandmarkCache
+
+    cache = LandmarkCache(options['cache_dir']) if options.get('cache_dir') else None
+    detector = CenterOfMassDetector(landmark_cache=cache, segment_model=options['segment_model'])
+
+    root, extension = os.path.splitext(output_path)
+    partial_path = root + '.part' + extension
+    stride_options = dict(inference_stride=options.get('inference_stride', 1),
+                          adaptive_stride=options.get('adaptive_stride', False),
+                          inference_size=options.get('inference_size'),
+                          roi_tracking=options.get('roi_tracking', False),
+                          smoothing=options.get('smoothing', True),
+                          num_poses=options.get('num_poses', 1),
+                          pose_model=options.get('pose_model'))
+    if options.get('series_format'):
+        detector.export_com_series(video_path, partial_path, **stride_options)
+    else:
+        detector.process_video(video_path, peso_persona, pipeline=options.get('pipeline', False),
+                               output_path=partial_path, encoder_profile=options['encoder_profile'],
+                               **stride_options)
+    os.replace(partial_path, output_path)
+    return dict(detector.last_run, video=video_path, output=output_path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Procesa lotes de videos y dibuja el esqueleto y el centro de masa, sin Streamlit.")
+    parser.add_argument('inputs', nargs='+', help="Directorios, patrones glob o archivos de video")
+    parser.add_argument('-o', '--output-dir', required=True, help="Directorio de salida")
+    parser.add_argument('--peso', type=float, default=70.0, help="Peso de la persona en kg")
+    parser.add_argument('-j', '--jobs', type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help="Cantidad máxima de videos procesados a la vez")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Usa el pipeline de decodificación/pose/codificación en hilos")
+    parser.add_argument('--analysis-only', action='store_true',
+                        help="Solo escribe la serie de tiempo del centro de masa, sin video")
+    parser.add_argument('--format', choices=('parquet', 'npz'),
+                        help="Formato de la serie de tiempo (por defecto Parquet si hay pyarrow)")
+    parser.add_argument('--stride', type=int, default=1,
+                        help="Ejecuta MediaPipe cada N frames e interpola los demás")
+    parser.add_argument('--adaptive-stride', action='store_true',
+                        help="Ajusta el paso de inferencia según el movimiento del centro de masa")
+    parser.add_argument('--inference-size', type=int,
+                        help="Lado mayor máximo (px) de la imagen que recibe MediaPipe")
+    parser.add_argument('--roi', action='store_true',
+                        help="Recorta una ventana alrededor de la persona antes de la inferencia")
+    parser.add_argument('--encoder-profile', choices=sorted(ENCODER_PROFILES), default=DEFAULT_ENCODER_PROFILE,
+                        help="Perfil de codificación del video de salida (codec, preset y calidad)")
+    parser.add_argument('--segment-model', choices=sorted(SEGMENT_MODELS), default=DEFAULT_SEGMENT_MODEL,
+                        help="Modelo segmental usado para el centro de masa")
+    parser.add_argument('--no-smoothing', action='store_true',
+                        help="No aplica el filtro temporal (One-Euro) a los landmarks")
+    parser.add_argument('--multi-person', type=int, default=1, metavar='N',
+                        help="Sigue hasta N personas por frame (requiere el modelo de PoseLandmarker)")
+    parser.add_argument('--pose-model', help="Ruta del modelo .task de PoseLandmarker para --multi-person")
+    parser.add_argument('--cache-dir', help="Carpeta del caché de landmarks")
+    parser.add_argument('--no-resume', action='store_true',
+                        help="Vuelve a procesar videos cuya salida ya existe")
+    args = parser.parse_args(argv)
+
+    # El modo varias personas no usa caché, paso de inferencia, ventana ni pipeline
+    if args.multi_person > 1:
+        unsupported = [flag for flag, used in (('--stride', args.stride != 1),
+                                               ('--adaptive-stride', args.adaptive_stride),
+                                               ('--inference-size', args.inference_size is not None),
+                                               ('--roi', args.roi),
+                                               ('--pipeline', args.pipeline),
+                                               ('--cache-dir', args.cache_dir is not None)) if used]
+        if unsupported:
+            parser.error(f"--multi-person no admite: {', '.join(unsupported)}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    series_format = None
+    if args.analysis_only:
+        from classExport import parquet_available
+
+        series_format = args.format or ('parquet' if parquet_available() else 'npz')
+        if series_format == 'parquet' and not parquet_available():
+            print("pyarrow no está instalado; se usará .npz", file=sys.stderr)
+            series_format = 'npz'
+
+    jobs = []
+    for video_path in find_videos(args.inputs):
+        output_path = output_path_for(video_path, args.output_dir, series_format)
+        if not args.no_resume and os.path.exists(output_path):
+            print(f"[omitido] {video_path}: ya existe {output_path}")
+            continue
+        jobs.append((video_path, output_path))
+
+    if not jobs:
+        print("No hay videos por procesar.")
+        return 0
+
+    options = {
+        'pipeline': args.pipeline,
+        'cache_dir': args.cache_dir,
+        'series_format': series_format,
+        'inference_stride': args.stride,
+        'adaptive_stride': args.adaptive_stride,
+        'inference_size': args.inference_size,
+        'roi_tracking': args.roi,
+        'encoder_profile': args.encoder_profile,
+        'segment_model': args.segment_model,
+        'smoothing': not args.no_smoothing,
+        'num_poses': args.multi_person,
+        'pose_model': args.pose_model,
+    }
+    start_time = time.perf_counter()
+    total_frames = 0
+    failures = 0
+
+    # spawn: cada proceso crea su propio grafo de MediaPipe
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs), mp_context=context) as executor:
+        futures = {
+            executor.submit(_run_job, video_path, output_path, args.peso, options): video_path
+            for video_path, output_path in jobs
+        }
+        for future in as_completed(futures):
+            try:
+                stats = future.result()
+            except Exception as exc:
+                failures += 1
+                print(f"[error] {futures[future]}: {exc}", file=sys.stderr)
+                continue
+            total_frames += stats['frames']
+            encoder = f" [{stats['encoder']}: {stats['encode_fps']:.1f} frames/s]" if stats.get('encode_fps') else ""
+            print(f"[ok] {stats['video']}: {stats['frames']} frames en {stats['seconds']:.1f} s "
+                  f"({stats['fps']:.1f} frames/s){encoder} -> {stats['output']}")
+
+    wall_time = time.perf_counter() - start_time
+    print(f"Total: {len(jobs) - failures}/{len(jobs)} videos, {total_frames} frames en {wall_time:.1f} s "
+          f"({total_frames / wall_time if wall_time > 0 else 0.0:.1f} frames/s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+import argparse
+import functools
+import json
+import os
+import sys
+import statistics
+import tempfile
+import timeit
+
+import av
+import cv2
+import numpy as np
+
+# Permite importar los módulos del proyecto desde benchmarks/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classEncoder import ENCODER_PROFILES  # noqa: E402
+from comEngine import NUM_LANDMARKS, center_of_mass_batch  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+FIXTURES_DIR = os.path.join(tempfile.gettempdir(), 'funmeca_bench')
+
+# Casos de video: (ancho, alto, fps, segundos). Los clips duran lo suficiente
+# para que el arranque del grafo y del codificador no domine la medición.
+QUICK_CASES = [(640, 360, 30, 6), (1280, 720, 30, 6), (1280, 720, 60, 6)]
+FULL_CASES = QUICK_CASES + [(1920, 1080, 30, 10), (1920, 1080, 120, 5), (3840, 2160, 30, 5)]
+
+# Pares de landmarks que forman la figura sintética
+FIGURE_BONES = [(11, 12), (11, 13), (13, 15), (12, 14), (14, 16), (11, 23), (12, 24),
+                (23, 24), (23, 25), (25, 27), (24, 26), (26, 28)]
+
+
+# Landmarks sintéticos: una figura que camina con ruido de random walk
+def synthetic_landmarks(n_frames, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.35, 0.65, size=(NUM_LANDMARKS, 3)).astype(np.float32)
+    base[:, 2] -= 0.5
+    drift = np.cumsum(rng.normal(0, 0.002, size=(n_frames, 1, 3)), axis=0).astype(np.float32)
+    jitter = rng.normal(0, 0.001, size=(n_frames, NUM_LANDMARKS, 3)).astype(np.float32)
+    return np.clip(base + drift + jitter, 0, 1)
+
+
+# Genera (o reutiliza) un video sintético con una figura en movimiento
+def make_synthetic_video(width, height, fps, seconds, fixtures_dir=FIXTURES_DIR):
+    os.makedirs(fixtures_dir, exist_ok=True)
+    path = os.path.join(fixtures_dir, f"synthetic_{width}x{height}_{fps}fps_{seconds}s.mp4")
+    if os.path.exists(path):
+        return path
+
+    n_frames = int(fps * seconds)
+    landmarks = synthetic_landmarks(n_frames)
+    container = av.open(path + '.part.mp4', mode='w')
+    stream = container.add_stream('libx264' if 'libx264' in av.codecs_available else 'mpeg4', rate=fps)
+    stream.width = width
+    stream.height = height
+    stream.pix_fmt = 'yuv420p'
+
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    for points in landmarks:
+        image[:] = (40, 90, 40)
+        px = (points[:, :2] * (width, height)).astype(int)
+        for start, end in FIGURE_BONES:
+            cv2.line(image, tuple(px[start]), tuple(px[end]), (230, 200, 170), max(2, width // 160))
+        cv2.circle(image, tuple(px[0]), max(4, width // 60), (230, 200, 170), -1)
+        for packet in stream.encode(av.VideoFrame.from_ndarray(image, format='rgb24')):
+            container.mux(packet)
+    for packet in stream.encode():
+        container.mux(packet)
+    container.close()
+    os.replace(path + '.part.mp4', path)
+    return path
+
+
+# Landmarks grabados (.npy con (n, 33, 3) o .npz del caché) o sintéticos
+def load_landmarks(path, n_frames):
+    if path is None:
+        return synthetic_landmarks(n_frames)
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            return data['landmarks']
+    return np.load(path)
+
+
+# Casos de reproducción de landmarks por el cálculo del CM: nombre -> función
+def landmark_replay_cases(detector, landmarks):
+    return {
+        'com_per_frame': lambda: [detector.calculate_center_of_mass(frame, 0) for frame in landmarks],
+        'com_batch': lambda: center_of_mass_batch(landmarks),
+    }
+
+
+# Mide un caso de reproducción de landmarks. Como con timeit, cada medición
+# repite la llamada hasta durar al menos 0.2 s (autorange) y se toma la mejor
+# de `repeats` mediciones.
+def bench_landmark_case(run, n_frames, repeats=15):
+    timer = timeit.Timer(run)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeats, number)) / number
+    return {'frames': n_frames, 'seconds': best, 'fps': n_frames / best if best > 0 else float('inf')}
+
+
+# Reproduce landmarks por el cálculo del CM, por frame y en lote
+def bench_landmark_replay(detector, landmarks, repeats=15):
+    return {name: bench_landmark_case(run, len(landmarks), repeats)
+            for name, run in landmark_replay_cases(detector, landmarks).items()}
+
+
+# Procesa un video completo `repeats` veces y devuelve la corrida mediana:
+# frames/s, costo por etapa, memoria y el codificador usado con su velocidad y
+# el tamaño del archivo
+def bench_process_video(detector, video_path, repeats=3, **options):
+    runs = []
+    for _ in range(max(1, repeats)):
+        output_path = detector.process_video(video_path, 70.0, **options)
+        os.remove(output_path)
+        runs.append((detector.last_run['fps'], dict(detector.last_run), detector.last_profile))
+    fps = statistics.median_low([run[0] for run in runs])
+    _, last_run, profile = next(run for run in runs if run[0] == fps)
+    return {
+        'frames': profile['frames'],
+        'seconds': last_run['seconds'],
+        'fps': last_run['fps'],
+        'encoder': last_run['encoder'],
+        'encode_fps': last_run['encode_fps'],
+        'output_bytes': last_run['output_bytes'],
+        'peak_rss_mb': profile['peak_rss_mb'],
+        'stages_mean_ms': {name: stats['mean_ms'] for name, stats in profile['stages'].items()},
+    }
+
+
+# Compara frames/s con la línea base; devuelve {caso: descripción} de las regresiones.
+# Un caso sin línea base también cuenta: si no, la comparación nunca fallaría.
+def compare_with_baseline(results, baseline, threshold):
+    regressions = {}
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            regressions[name] = f"{name}: no está en la línea base (ejecutar con --update-baseline)"
+            continue
+        floor = reference['fps'] * (1 - threshold)
+        if result['fps'] < floor:
+            regressions[name] = (f"{name}: {result['fps']:.1f} frames/s < {floor:.1f} "
+                                 f"(línea base {reference['fps']:.1f})")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark reproducible del pipeline de centro de masa.")
+    parser.add_argument('--full', action='store_true', help="Incluye resoluciones y duraciones mayores")
+    parser.add_argument('--landmarks', help="Landmarks grabados (.npy o .npz del caché) para reproducir")
+    parser.add_argument('--pipeline', action='store_true', help="Usa el pipeline en hilos en process_video")
+    parser.add_argument('--encoder-profiles', action='store_true',
+                        help="Compara los perfiles de codificación (velocidad y tamaño) en 1280x720")
+    parser.add_argument('--skip-video', action='store_true', help="Solo mide el cálculo del CM")
+    parser.add_argument('--repeats', type=int, default=3,
+                        help="Corridas de process_video por caso (se toma la mediana)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Archivo JSON de línea base")
+    parser.add_argument('--update-baseline', action='store_true', help="Guarda los resultados como línea base")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Caída de frames/s tolerada respecto a la línea base (0.2 = 20%%)")
+    parser.add_argument('--retries', type=int, default=2,
+                        help="Veces que se vuelve a medir un caso que parece una regresión")
+    parser.add_argument('--fixtures-dir', default=FIXTURES_DIR, help="Carpeta de los videos sintéticos")
+    parser.add_argument('--output', help="Escribe los resultados en este archivo JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    from master import CenterOfMassDetector
+
+    detector = CenterOfMassDetector()
+    landmarks = load_landmarks(args.landmarks, 10000)
+
+    # Cada caso es una función que lo mide, para poder repetirlo si parece una regresión
+    cases = {name: functools.partial(bench_landmark_case, run, len(landmarks))
+             for name, run in landmark_replay_cases(detector, landmarks).items()}
+
+    if not args.skip_video:
+        for width, height, fps, seconds in (FULL_CASES if args.full else QUICK_CASES):
+            video_path = make_synthetic_video(width, height, fps, seconds, args.fixtures_dir)
+            cases[f"video_{width}x{height}_{fps}fps_{seconds}s"] = functools.partial(
+                bench_process_video, detector, video_path, args.repeats, pipeline=args.pipeline)
+
+    if args.encoder_profiles:
+        video_path = make_synthetic_video(1280, 720, 30, 6, args.fixtures_dir)
+        for encoder_profile in ENCODER_PROFILES:
+            cases[f"encoder_{encoder_profile}_1280x720"] = functools.partial(
+                bench_process_video, detector, video_path, args.repeats, pipeline=args.pipeline,
+                encoder_profile=encoder_profile)
+
+    results = {name: measure() for name, measure in cases.items()}
+
+    if args.encoder_profiles:
+        for encoder_profile in ENCODER_PROFILES:
+            result = results[f"encoder_{encoder_profile}_1280x720"]
+            print(f"encoder_{encoder_profile}: {result['encoder']}, {result['encode_fps']:.1f} frames/s de "
+                  f"codificación, {result['output_bytes'] / 1024:.0f} KB")
+
+    for name, result in results.items():
+        print(f"{name}: {result['fps']:.1f} frames/s ({result['frames']} frames en {result['seconds']:.3f} s)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Línea base guardada en {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"[regresión] no existe la línea base {args.baseline}; "
+              f"ejecutar con --update-baseline para crearla", file=sys.stderr)
+        return 1
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(results, baseline, args.threshold)
+
+    # Una regresión se confirma volviendo a medir el caso: el ruido de la
+    # máquina (otros procesos, frecuencia de la CPU) dura a veces varios segundos
+    for _ in range(args.retries):
+        retry = [name for name in regressions if name in baseline]
+        if not retry:
+            break
+        for name in retry:
+            result = cases[name]()
+            print(f"{name} (nueva medición): {result['fps']:.1f} frames/s")
+            if result['fps'] > results[name]['fps']:
+                results[name] = result
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+
+    for regression in regressions.values():
+        print(f"[regresión] {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
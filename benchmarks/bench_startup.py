@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos de entrada que se miden y dependencias pesadas que no deberían cargar
+ENTRY_MODULES = ['master', 'classCOM', 'classFrontend', 'batch']
+HEAVY_MODULES = ['mediapipe', 'av', 'cv2', 'PIL', 'pandas', 'matplotlib']
+
+
+# Importa `module` en un intérprete nuevo con -X importtime y devuelve el tiempo
+# de pared, el tiempo de importación y las dependencias pesadas que se cargaron
+def measure_import(module, python=sys.executable):
+    start = time.perf_counter()
+    result = subprocess.run([python, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=PROJECT_DIR, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{result.stderr}")
+
+    cumulative = {}
+    import_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            import_us += int(cumulative_us)
+        cumulative.setdefault(name.strip(), int(cumulative_us))
+
+    return {
+        'wall_s': wall,
+        'import_s': import_us / 1e6,
+        'heavy_modules': {name: cumulative[name] / 1e6 for name in HEAVY_MODULES if name in cumulative},
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mide el tiempo de arranque en frío de los puntos de entrada.")
+    parser.add_argument('modules', nargs='*', default=ENTRY_MODULES, help="Módulos a importar")
+    parser.add_argument('--budget', type=float, default=0.5,
+                        help="Tiempo máximo de importación por módulo en segundos")
+    parser.add_argument('--repeats', type=int, default=3, help="Mediciones por módulo (se toma la mejor)")
+    parser.add_argument('--output', help="Escribe los resultados en este archivo JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    results = {}
+    over_budget = []
+    for module in args.modules:
+        runs = [measure_import(module) for _ in range(max(1, args.repeats))]
+        results[module] = best = min(runs, key=lambda run: run['import_s'])
+        heavy = ', '.join(f"{name} {seconds:.2f} s" for name, seconds in best['heavy_modules'].items())
+        print(f"{module}: importación {best['import_s']:.3f} s, arranque total {best['wall_s']:.3f} s"
+              + (f" (carga {heavy})" if heavy else ""))
+        if best['import_s'] > args.budget:
+            over_budget.append(module)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    for module in over_budget:
+        print(f"[presupuesto] {module} supera {args.budget:.2f} s", file=sys.stderr)
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,104 +1,109 @@
-import mediapipe as mp
-import streamlit as st
-import tempfile
-import av
+# mediapipe, av, PIL y Streamlit se importan donde se usan, para que las
+# páginas de documentación no carguen MediaPipe
+import functools
+import os
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+from classUpload import spool_upload
+from comEngine import DEFAULT_SEGMENT_MODEL, center_of_mass_batch, landmarks_to_array, segment_model_weights
+
+
+# Dibuja un círculo relleno sobre el array RGB, sin copiar la imagen
+def draw_disk(image, cx, cy, radius, color):
+    height, width, _ = image.shape
+    x0, x1 = max(cx - radius, 0), min(cx + radius + 1, width)
+    y0, y1 = max(cy - radius, 0), min(cy + radius + 1, height)
+    if x0 >= x1 or y0 >= y1:
+        return
+    ys, xs = np.ogrid[y0:y1, x0:x1]
+    mask = (xs - cx) ** 2 + (ys - cy) ** 2 <= radius ** 2
+    image[y0:y1, x0:x1][mask] = color
+
+
+# Dibuja texto sobre el array RGB; PIL solo rasteriza el recuadro del texto
+def draw_text(image, x, y, text, color):
+    from PIL import Image, ImageDraw
+
+    height, width, _ = image.shape
+    left, top, right, bottom = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((0, 0), text)
+    patch = Image.new('L', (right, bottom))
+    ImageDraw.Draw(patch).text((0, 0), text, fill=255)
+    mask = np.asarray(patch) > 127
+
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + right, width), min(y + bottom, height)
+    if x0 >= x1 or y0 >= y1:
+        return
+    image[y0:y1, x0:x1][mask[y0 - y:y1 - y, x0 - x:x1 - x]] = color
+
 
 # Clase encargada de la detección del centro de masa
 class CenterOfMassDetector:
-    def __init__(self):
-        self.mp_pose = mp.solutions.pose
-        self.mp_drawing = mp.solutions.drawing_utils
+    def __init__(self, segment_model=DEFAULT_SEGMENT_MODEL):
+        # Modelo segmental del CM, compilado a una matriz de pesos
+        self.segment_weights = segment_model_weights(segment_model)
+
+    @functools.cached_property
+    def mp_pose(self):
+        import mediapipe as mp
+        return mp.solutions.pose
+
+    @functools.cached_property
+    def mp_drawing(self):
+        import mediapipe as mp
+        return mp.solutions.drawing_utils
 
     # Función para calcular el centro de un segmento
     def segment_center(self, point1, point2):
         return [(point1[0] + point2[0]) / 2, (point1[1] + point2[1]) / 2, (point1[2] + point2[2]) / 2]
 
-    # Función para calcular el centro de masa (CM)
+    # Función para calcular el centro de masa (CM) de un solo frame.
+    # Es un envoltorio de center_of_mass_batch; el peso se cancela en el promedio.
     def calculate_center_of_mass(self, landmarks, peso_persona):
-        # Relación de masas por segmentos del cuerpo (valores aproximados)
-        segment_mass_ratios = {
-            'head': 0.08,
-            'torso': 0.5,
-            'upper_arm': 0.03,
-            'lower_arm': 0.02,
-            'thigh': 0.1,
-            'lower_leg': 0.05
-        }
-
-        # Extraer las coordenadas relevantes de los landmarks
-        head_center = [landmarks[self.mp_pose.PoseLandmark.NOSE.value].x,
-                       landmarks[self.mp_pose.PoseLandmark.NOSE.value].y,
-                       landmarks[self.mp_pose.PoseLandmark.NOSE.value].z]
-
-        torso_center = [landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                        landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].y,
-                        landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].z]
-
-        upper_arm_center = self.segment_center(
-            [landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].z],
-            [landmarks[self.mp_pose.PoseLandmark.RIGHT_ELBOW.value].x,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_ELBOW.value].y,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_ELBOW.value].z]
-        )
-
-        thigh_center = self.segment_center(
-            [landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].y,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].z],
-            [landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE.value].x,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE.value].y,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE.value].z]
-        )
-
-        # Calcular el eje X como el punto medio entre las dos caderas
-        hip_right = [landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                     landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].y,
-                     landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].z]
-
-        hip_left = [landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].z]
-
-        cm_x = (hip_right[0] + hip_left[0]) / 2
-
-        # Centros y masas de los segmentos corporales
-        segment_centers = [
-            (head_center, segment_mass_ratios['head'] * peso_persona),
-            (torso_center, segment_mass_ratios['torso'] * peso_persona),
-            (upper_arm_center, segment_mass_ratios['upper_arm'] * peso_persona),
-            (thigh_center, segment_mass_ratios['thigh'] * peso_persona)
-        ]
-
-        # Calcular el centro de masa en el eje Y y Z, manteniendo el nuevo eje X
-        total_mass = sum(mass for _, mass in segment_centers)
-        cm_y = sum(center[1] * mass for center, mass in segment_centers) / total_mass
-        cm_z = sum(center[2] * mass for center, mass in segment_centers) / total_mass
-
-        return cm_x, cm_y, cm_z
+        if not isinstance(landmarks, np.ndarray):
+            landmarks = landmarks_to_array(landmarks)
+        cm_x, cm_y, cm_z = center_of_mass_batch(landmarks[np.newaxis], self.segment_weights)[0]
+        return float(cm_x), float(cm_y), float(cm_z)
+
+    # Calcula el centro de masa de muchos frames en una sola operación.
+    # landmarks: array (n_frames, 33, 3); devuelve un array (n_frames, 3)
+    def calculate_center_of_mass_batch(self, landmarks):
+        return center_of_mass_batch(landmarks, self.segment_weights)
 
     # Procesa el video y detecta el esqueleto junto con el centro de masa
     def process_video(self, uploaded_file, peso_persona):
-        # Crear un archivo temporal para almacenar el video
-        tfile = tempfile.NamedTemporaryFile(delete=False)
-        tfile.write(uploaded_file.read())
+        import av
+        import streamlit as st
+        from classPreview import ThrottledPreview
+
+        # Copiar el video por bloques a un archivo temporal, sin leerlo entero en memoria
+        input_path, _ = spool_upload(uploaded_file)
+
+        # Vista previa reducida y limitada a pocas actualizaciones por segundo
+        preview = ThrottledPreview(st)
+
+        # Abre el video usando av; el temporal se borra aunque falle el procesamiento
+        try:
+            with av.open(input_path) as video:
+                self._annotate_frames(video, peso_persona, preview)
+        finally:
+            os.remove(input_path)
+
+        preview.finish()
 
-        # Abre el video usando av
-        video = av.open(tfile.name)
-        stframe = st.empty()
+    # Detecta el esqueleto y el CM en cada frame y los muestra en la vista previa
+    def _annotate_frames(self, video, peso_persona, preview):
+        total_frames = video.streams.video[0].frames
 
         with self.mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
-            for frame in video.decode(video=0):
-                # Convertir el frame a un array de numpy
-                image = np.array(frame.to_image())
+            for index, frame in enumerate(video.decode(video=0)):
+                # Convertir el frame a un array de numpy (una sola copia)
+                image = frame.to_ndarray(format='rgb24')
 
                 # Procesa la imagen para detectar poses
                 results = pose.process(image)
 
                 # Dibujar el esqueleto y el centro de masa en la imagen
+                com = None
                 if results.pose_landmarks:
                     landmarks = results.pose_landmarks.landmark
 
@@ -106,25 +111,19 @@ class CenterOfMassDetector:
                     self.mp_drawing.draw_landmarks(image, results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS)
 
                     # Calcular el centro de masa
-                    cm_x, cm_y, cm_z = self.calculate_center_of_mass(landmarks, peso_persona)
+                    cm_x, cm_y, cm_z = com = self.calculate_center_of_mass(landmarks, peso_persona)
 
                     # Dibujar el centro de masa en la imagen
                     height, width, _ = image.shape
                     cm_x_px = int(cm_x * width)
                     cm_y_px = int(cm_y * height)
 
-                    # Convertir la imagen a PIL para dibujar
-                    img_pil = Image.fromarray(image)
-                    draw = ImageDraw.Draw(img_pil)
-                    draw.ellipse((cm_x_px - 5, cm_y_px - 5, cm_x_px + 5, cm_y_px + 5), fill=(255, 0, 0))
+                    # Dibujar el punto rojo directamente sobre el array
+                    draw_disk(image, cm_x_px, cm_y_px, 5, (255, 0, 0))
 
                     # Dibujar las coordenadas X, Y, Z junto al punto rojo
                     text = f"X: {cm_x:.2f}, Y: {cm_y:.2f}, Z: {cm_z:.2f}"
-                    draw.text((cm_x_px + 10, cm_y_px - 10), text, fill=(255, 255, 255))
-
-                    # Mostrar la imagen con esqueleto, centro de masa y coordenadas
-                    stframe.image(img_pil, use_column_width=True)
-
-
-
+                    draw_text(image, cm_x_px + 10, cm_y_px - 10, text, (255, 255, 255))
 
+                # Mostrar la imagen con esqueleto, centro de masa y coordenadas
+                preview(index, total_frames, image, com)
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+# Carpeta por defecto del caché de landmarks
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'funmeca_landmarks')
+
+
+# Hash SHA-256 del contenido de un archivo, leído por bloques
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Caché en disco de los landmarks por frame de un video.
+# La clave combina el hash del contenido del video y la configuración de Pose;
+# el tamaño total se limita a max_bytes descartando primero lo menos usado (LRU).
+class LandmarkCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # Clave de caché para un video y una configuración de Pose
+    def make_key(self, content_hash, pose_options):
+        config = json.dumps(pose_options, sort_keys=True)
+        return hashlib.sha256(f"{content_hash}:{config}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    # Devuelve (landmarks, visibility, detected) o None si no está en caché.
+    # landmarks: (n_frames, 33, 3) float32, visibility: (n_frames, 33) float32,
+    # detected: (n_frames,) bool indica en qué frames se detectó a la persona.
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                entry = data['landmarks'], data['visibility'], data['detected']
+        except (OSError, KeyError, ValueError):
+            return None
+
+        # Marca la entrada como usada recientemente; otro proceso pudo haberla
+        # descartado después de leerla, pero los datos ya están en memoria
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    # Guarda los landmarks de un video y aplica el límite de tamaño
+    def put(self, key, landmarks, visibility, detected):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f,
+                     landmarks=np.asarray(landmarks, dtype=np.float32),
+                     visibility=np.asarray(visibility, dtype=np.float32),
+                     detected=np.asarray(detected, dtype=bool))
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    # Elimina las entradas usadas hace más tiempo hasta respetar max_bytes
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npz'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
@@ -0,0 +1,121 @@
+from fractions import Fraction
+import threading
+
+# Perfiles de codificación del video de salida. Cada perfil lista codecs
+# candidatos en orden de preferencia (primero los de hardware) con sus opciones;
+# se usa el primero que se pueda abrir en esta máquina. mpeg4 viene con todo
+# FFmpeg y queda siempre como último recurso.
+#   preview:  salida rápida para revisar el resultado, archivo más grande
+#   analysis: calidad alta para revisar el esqueleto cuadro a cuadro (por defecto)
+#   archival: archivo chico para guardar, codifica más lento
+# Los codecs sin modo de calidad constante usable desde PyAV (mpeg4, videotoolbox)
+# se controlan por bitrate: 'bpp' son bits por píxel y por frame, y se convierte
+# al bitrate ('b') según el tamaño y la cadencia del video.
+# 'threads' es la cantidad de hilos del codificador (0 = uno por núcleo) y
+# 'thread_type' cómo se reparten: SLICE no agrega frames de retraso (vista en
+# vivo); FRAME rinde más pero retiene frames.
+ENCODER_PROFILES = {
+    'preview': {
+        'candidates': [
+            ('h264_nvenc', {'preset': 'p1', 'rc': 'vbr', 'cq': '30'}),
+            ('h264_qsv', {'preset': 'veryfast', 'global_quality': '30'}),
+            ('h264_videotoolbox', {'realtime': '1', 'bpp': 0.05}),
+            ('libx264', {'preset': 'ultrafast', 'tune': 'zerolatency', 'crf': '28'}),
+            ('mpeg4', {'bpp': 0.05}),
+        ],
+        'threads': 4,
+        'thread_type': 'SLICE',
+    },
+    'analysis': {
+        'candidates': [
+            ('h264_nvenc', {'preset': 'p4', 'rc': 'vbr', 'cq': '20'}),
+            ('h264_qsv', {'preset': 'medium', 'global_quality': '20'}),
+            ('h264_videotoolbox', {'bpp': 0.2}),
+            ('libx264', {'preset': 'veryfast', 'crf': '20'}),
+            ('mpeg4', {'bpp': 0.2}),
+        ],
+        'threads': 0,
+        'thread_type': 'FRAME',
+    },
+    # Con pocos hilos, un video archivado no le quita núcleos a los trabajos en curso
+    'archival': {
+        'candidates': [
+            ('libx265', {'preset': 'medium', 'crf': '26', 'tag': 'hvc1',
+                         'x265-params': 'log-level=error:pools=2'}),
+            ('hevc_nvenc', {'preset': 'p6', 'rc': 'vbr', 'cq': '26', 'tag': 'hvc1'}),
+            ('libx264', {'preset': 'slow', 'crf': '23'}),
+            ('mpeg4', {'bpp': 0.08}),
+        ],
+        'threads': 2,
+        'thread_type': 'FRAME',
+    },
+}
+DEFAULT_ENCODER_PROFILE = 'analysis'
+
+# Resultado de probar cada codec: (nombre, opciones) -> True/False
+_probe_results = {}
+_probe_lock = threading.Lock()
+
+
+# Intenta abrir un codificador con un frame chico: que FFmpeg lo tenga
+# compilado no garantiza que exista el hardware o el driver
+def probe_encoder(codec_name, options):
+    import av
+
+    key = (codec_name, tuple(sorted(options.items())))
+    with _probe_lock:
+        if key in _probe_results:
+            return _probe_results[key]
+
+    available = codec_name in av.codecs_available
+    if available:
+        try:
+            context = av.CodecContext.create(codec_name, 'w')
+            context.width = 64
+            context.height = 64
+            context.pix_fmt = 'yuv420p'
+            context.time_base = Fraction(1, 30)
+            context.options = _codec_options(options, 64, 64, 30)
+            context.open()
+        except Exception:
+            available = False
+
+    with _probe_lock:
+        _probe_results[key] = available
+    return available
+
+
+# Opciones para FFmpeg: sin 'tag' (va en el stream) y con 'bpp' convertido a bitrate
+def _codec_options(options, width, height, rate):
+    options = {name: value for name, value in options.items() if name != 'tag'}
+    bpp = options.pop('bpp', None)
+    if bpp is not None:
+        options['b'] = str(int(bpp * width * height * float(rate or 30)))
+    return options
+
+
+# Primer codec disponible del perfil: (nombre, opciones)
+def select_encoder(profile=DEFAULT_ENCODER_PROFILE):
+    if profile not in ENCODER_PROFILES:
+        raise ValueError(f"Perfil de codificación desconocido: {profile} "
+                         f"(opciones: {', '.join(ENCODER_PROFILES)})")
+    for codec_name, options in ENCODER_PROFILES[profile]['candidates']:
+        if probe_encoder(codec_name, options):
+            return codec_name, options
+    raise RuntimeError(f"Ningún codificador del perfil {profile} está disponible")
+
+
+# Agrega al contenedor el stream de video del perfil, con el tamaño y la
+# cadencia de la entrada
+def add_output_stream(container, width, height, rate, profile=DEFAULT_ENCODER_PROFILE):
+    codec_name, options = select_encoder(profile)
+    stream = container.add_stream(codec_name, rate=rate, options=_codec_options(options, width, height, rate))
+    stream.width = width
+    stream.height = height
+    stream.pix_fmt = 'yuv420p'
+    if 'tag' in options:
+        stream.codec_tag = options['tag']
+
+    stream.codec_context.thread_count = ENCODER_PROFILES[profile]['threads']
+    stream.codec_context.thread_type = ENCODER_PROFILES[profile]['thread_type']
+    return stream
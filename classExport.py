@@ -0,0 +1,52 @@
+import numpy as np
+
+from comEngine import NUM_LANDMARKS
+
+
+# Arma las columnas de la serie de tiempo del centro de masa.
+# times: (n,), com: (n, 3), visibility: (n, 33), detected: (n,)
+# En modo varias personas hay una fila por persona y frame: frames y track_ids
+# (n,) indican a qué frame y a qué track pertenece cada fila.
+def com_series_columns(times, com, visibility, detected, frames=None, track_ids=None):
+    columns = {
+        'frame': np.arange(len(times), dtype=np.int64) if frames is None else np.asarray(frames, dtype=np.int64),
+        'time': np.asarray(times, dtype=np.float64),
+    }
+    if track_ids is not None:
+        columns['track_id'] = np.asarray(track_ids, dtype=np.int64)
+    columns.update({
+        'detected': np.asarray(detected, dtype=bool),
+        'com_x': com[:, 0],
+        'com_y': com[:, 1],
+        'com_z': com[:, 2],
+    })
+    for i in range(NUM_LANDMARKS):
+        columns[f'vis_{i:02d}'] = visibility[:, i]
+    return columns
+
+
+# Indica si pyarrow está instalado para escribir Parquet
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# Escribe las columnas en Parquet si la ruta termina en .parquet y pyarrow está
+# disponible; en cualquier otro caso en un .npz. Devuelve la ruta escrita.
+def write_com_series(path, columns):
+    if path.endswith('.parquet'):
+        if parquet_available():
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            pq.write_table(pa.table(columns), path)
+            return path
+        path = path[:-len('.parquet')] + '.npz'
+
+    if not path.endswith('.npz'):
+        path += '.npz'
+    np.savez(path, **columns)
+    return path
@@ -0,0 +1,106 @@
+import math
+
+import numpy as np
+
+
+# Filtro One-Euro (Casiez et al., 2012) para arrays de cualquier forma.
+# Es un pasabajos cuyo corte sube con la velocidad: suaviza mucho el temblor
+# cuando el punto está quieto y agrega poco retraso cuando se mueve rápido.
+# Solo guarda el último valor, la última derivada y el último tiempo.
+class OneEuroFilter:
+    def __init__(self, min_cutoff=1.5, beta=10.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.derivative = None
+        self.timestamp = None
+
+    # Factor de suavizado para una frecuencia de corte (Hz) y un paso dt (s)
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    # Filtra `value` en `timestamp` (segundos). weight (0 a 1, con la forma de
+    # value o difundible a ella) reduce la corrección: con peso 0 se mantiene la
+    # estimación anterior.
+    def __call__(self, value, timestamp, weight=None):
+        value = np.asarray(value, dtype=np.float64)
+        if self.value is None:
+            self.value = value.copy()
+            self.derivative = np.zeros_like(value)
+            self.timestamp = timestamp
+            return self.value
+
+        dt = timestamp - self.timestamp
+        if dt <= 0:
+            dt = 1e-3
+        if weight is not None:
+            value = self.value + weight * (value - self.value)
+        derivative = (value - self.value) / dt
+        self.derivative += self._alpha(self.d_cutoff, dt) * (derivative - self.derivative)
+
+        cutoff = self.min_cutoff + self.beta * np.abs(self.derivative)
+        self.value = self.value + self._alpha(cutoff, dt) * (value - self.value)
+        self.timestamp = timestamp
+        return self.value
+
+    # Extrapola la última estimación con la velocidad filtrada
+    def predict(self, timestamp):
+        return self.value + self.derivative * (timestamp - self.timestamp)
+
+
+# Filtro temporal de las detecciones (landmarks, visibilidad) de un video.
+# Cada landmark se corrige en proporción a su visibilidad, así los puntos
+# ocluidos siguen su trayectoria en lugar de saltar. Un landmark que salta más de
+# max_jump (coordenadas normalizadas) respecto de la estimación se descarta como
+# atípico, salvo que el salto se repita max_rejections frames seguidos. Si no hay
+# detección, hasta max_gap frames se rellenan extrapolando con la velocidad.
+# Como el CM es una combinación lineal de los landmarks, calcularlo sobre los
+# landmarks filtrados equivale a filtrar también el CM.
+class LandmarkFilter:
+    def __init__(self, min_cutoff=1.5, beta=10.0, d_cutoff=1.0, max_gap=5, max_jump=0.15,
+                 max_rejections=2, gap_visibility_decay=0.8):
+        self.filter = OneEuroFilter(min_cutoff, beta, d_cutoff)
+        self.max_gap = max_gap
+        self.max_jump = max_jump
+        self.max_rejections = max_rejections
+        self.gap_visibility_decay = gap_visibility_decay
+        self.reset()
+
+    def reset(self):
+        self.filter.reset()
+        self.visibility = None
+        self.rejections = None
+        self.gap = 0
+
+    # Devuelve la detección filtrada para el frame en `timestamp` (segundos),
+    # o None si no hay detección ni una estimación reciente para rellenar
+    def update(self, detection, timestamp):
+        if detection is None:
+            if self.visibility is None or self.gap >= self.max_gap:
+                self.reset()
+                return None
+            self.gap += 1
+            self.visibility = self.visibility * self.gap_visibility_decay
+            return self.filter.predict(timestamp).astype(np.float32), self.visibility
+
+        landmarks, visibility = detection
+        self.gap = 0
+        if self.visibility is None:
+            self.rejections = np.zeros(len(landmarks), dtype=np.int32)
+            self.visibility = visibility
+            return self.filter(landmarks, timestamp).astype(np.float32), visibility
+
+        # Saltos atípicos: el landmark no corrige la estimación en este frame
+        jump = np.linalg.norm(landmarks[:, :2] - self.filter.predict(timestamp)[:, :2], axis=1)
+        outlier = (jump > self.max_jump) & (self.rejections < self.max_rejections)
+        self.rejections = np.where(outlier, self.rejections + 1, 0)
+
+        weight = np.where(outlier, 0.0, np.clip(visibility, 0.0, 1.0))[:, np.newaxis]
+        self.visibility = visibility
+        return self.filter(landmarks, timestamp, weight).astype(np.float32), visibility
@@ -0,0 +1,87 @@
+import av
+import cv2
+import numpy as np
+
+
+# Frame RGB preasignado: un av.VideoFrame rgb24 y un array de numpy que
+# comparte su memoria, de modo que lo que se dibuja en `array` se codifica
+# directamente desde `frame` sin copias intermedias.
+class RGBFrameBuffer:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.frame = av.VideoFrame(width, height, 'rgb24')
+        plane = self.frame.planes[0]
+        rows = np.frombuffer(plane, dtype=np.uint8).reshape(height, plane.line_size)
+        self.array = rows[:, :width * 3].reshape(height, width, 3)
+
+
+# Conjunto rotativo de RGBFrameBuffer para decodificar sin asignar memoria por frame.
+# `count` debe cubrir todos los frames en vuelo a la vez (p. ej. los de las colas
+# del pipeline); con un solo hilo basta con 1.
+class FrameBufferPool:
+    def __init__(self, width, height, count=1):
+        self.width = width
+        self.height = height
+        self.buffers = [RGBFrameBuffer(width, height) for _ in range(count)]
+        self._next = 0
+
+        # Buffer I420 intermedio, solo se usa si el video es yuv420p de tamaño par
+        self._yuv = np.empty((height * 3 // 2, width), dtype=np.uint8)
+        flat = self._yuv.reshape(-1)
+        y_size = width * height
+        c_size = (width // 2) * (height // 2)
+        self._planes = (
+            self._yuv[:height],
+            flat[y_size:y_size + c_size].reshape(height // 2, width // 2),
+            flat[y_size + c_size:y_size + 2 * c_size].reshape(height // 2, width // 2),
+        )
+        self._fast_path = width % 2 == 0 and height % 2 == 0
+
+        # Si width * 3 no es múltiplo de la alineación de línea de PyAV (p. ej. 854
+        # o 1366 de ancho) los arrays tienen relleno y no son contiguos; MediaPipe
+        # los recibe copiados en este buffer, que se asigna una sola vez
+        self._contiguous = None
+        if not self.buffers[0].array.flags.c_contiguous:
+            self._contiguous = np.empty((height, width, 3), dtype=np.uint8)
+
+        # Contadores de asignaciones: los buffers iniciales y las copias de respaldo
+        self.stats = {'frames': 0, 'buffer_allocations': count + 1 + (self._contiguous is not None),
+                      'frame_allocations': 0, 'contiguous_copies': 0}
+
+    # Convierte el frame decodificado a RGB dentro del siguiente buffer libre
+    def load(self, frame):
+        buffer = self.buffers[self._next]
+        self._next = (self._next + 1) % len(self.buffers)
+        self.stats['frames'] += 1
+
+        if (self._fast_path and frame.format.name == 'yuv420p'
+                and frame.width == self.width and frame.height == self.height):
+            for plane, dst in zip(frame.planes, self._planes):
+                rows, cols = dst.shape
+                src = np.frombuffer(plane, dtype=np.uint8).reshape(-1, plane.line_size)
+                np.copyto(dst, src[:rows, :cols])
+            cv2.cvtColor(self._yuv, cv2.COLOR_YUV2RGB_I420, dst=buffer.array)
+        else:
+            # Otros formatos: PyAV asigna un array nuevo que luego se copia
+            np.copyto(buffer.array, frame.to_ndarray(format='rgb24', width=self.width, height=self.height))
+            self.stats['frame_allocations'] += 1
+
+        buffer.frame.pts = None
+        return buffer
+
+    # Devuelve `array` (de un buffer del pool) en memoria contigua: el mismo array
+    # si no tiene relleno, o una copia en el buffer contiguo, válida hasta la
+    # siguiente llamada. Sirve para leerla, no para dibujar sobre ella.
+    def contiguous(self, array):
+        if array.flags.c_contiguous:
+            return array
+        np.copyto(self._contiguous, array)
+        self.stats['contiguous_copies'] += 1
+        return self._contiguous
+
+    # Asignaciones de arrays de frame completo por frame decodificado
+    def allocations_per_frame(self):
+        if not self.stats['frames']:
+            return 0.0
+        return self.stats['frame_allocations'] / self.stats['frames']
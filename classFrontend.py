@@ -1,7 +1,8 @@
-import streamlit as st
-
 class AppFrontend:
     def __init__(self, detector):
+        # Streamlit se importa aquí para que importar el módulo no lo cargue
+        import streamlit as st
+
         self.detector = detector
         self.st = st
 
@@ -47,12 +48,19 @@ class AppFrontend:
         que se utilizan para calcular el centro de masa ponderado:
         """)
         self.st.write("""
-        - **Cabeza**: 8% de la masa total.
-        - **Torso**: 50% de la masa total.
-        - **Brazo superior**: 3% de la masa total (por cada brazo).
-        - **Antebrazo**: 2% de la masa total (por cada antebrazo).
+        - **Cabeza y cuello**: 8.1% de la masa total.
+        - **Tronco**: 49.7% de la masa total.
+        - **Brazo superior**: 2.8% de la masa total (por cada brazo).
+        - **Antebrazo**: 1.6% de la masa total (por cada antebrazo).
+        - **Mano**: 0.6% de la masa total (por cada mano).
         - **Muslo**: 10% de la masa total (por cada muslo).
-        - **Pierna inferior**: 5% de la masa total (por cada pierna).
+        - **Pierna inferior**: 4.65% de la masa total (por cada pierna).
+        - **Pie**: 1.45% de la masa total (por cada pie).
+        """)
+        self.st.write("""
+        Se usan los segmentos de ambos lados del cuerpo. El centro de cada segmento se ubica entre sus 
+        extremos (por ejemplo, del hombro al codo) según la proporción que indica el modelo. También está 
+        disponible el modelo de **de Leva (1996)**, que ajusta los parámetros de Zatsiorsky-Seluyanov.
         """)
 
         # Ilustración del Cálculo
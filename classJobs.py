@@ -0,0 +1,211 @@
+import math
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from classUpload import spool_upload
+
+# Estados de un trabajo
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+# Se lanza dentro del procesamiento cuando el trabajo fue cancelado
+class JobCancelled(Exception):
+    pass
+
+
+# El usuario ya tiene el máximo de trabajos activos permitidos
+class JobLimitExceeded(RuntimeError):
+    pass
+
+
+# Estado de un video enviado a procesar
+class Job:
+    def __init__(self, job_id, user_id, input_path, peso_persona, options, owns_input=False):
+        self.id = job_id
+        self.user_id = user_id
+        self.input_path = input_path
+        self.peso_persona = peso_persona
+        self.options = options
+        self.owns_input = owns_input
+        self.content_hash = None
+        self.status = QUEUED
+        self.progress = (0, 0)
+        self.preview = None
+        self.com_rows = []
+        self.result = None
+        self.stats = {}
+        self.profile = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self.future = None
+        self._last_preview = 0.0
+
+
+# Cola de trabajos en segundo plano alrededor de CenterOfMassDetector.
+# submit devuelve un id y el video se procesa en un pool acotado de hilos, fuera
+# del hilo del script de Streamlit, así los reruns no descartan el trabajo.
+# Los trabajos terminados se olvidan (y se borra su video) pasados finished_ttl
+# segundos, por si la sesión se cerró antes de ver el resultado.
+class JobManager:
+    def __init__(self, detector_factory, max_workers=2, max_jobs_per_user=1, preview_fps=2.0,
+                 preview_width=480, finished_ttl=3600.0):
+        self.detector_factory = detector_factory
+        self.max_jobs_per_user = max_jobs_per_user
+        self.finished_ttl = finished_ttl
+        self.preview_interval = 1.0 / preview_fps
+        self.preview_width = preview_width
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='com-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    # Envía un video a procesar y devuelve el id del trabajo.
+    # La subida se copia a disco antes de encolar, porque el objeto de Streamlit
+    # no sobrevive a los reruns.
+    # El lugar del trabajo se reserva antes de copiar la subida, así dos envíos
+    # simultáneos del mismo usuario no superan juntos el límite; si la copia
+    # falla, la reserva se libera.
+    def submit(self, user_id, uploaded_file, peso_persona, **options):
+        self._evict_expired()
+        job = Job(uuid.uuid4().hex, user_id, None, peso_persona, options)
+        with self._lock:
+            active = sum(1 for other in self._jobs.values()
+                         if other.user_id == user_id and other.status in ACTIVE_STATES)
+            if active >= self.max_jobs_per_user:
+                raise JobLimitExceeded(f"El usuario ya tiene {active} trabajo(s) en proceso")
+            self._jobs[job.id] = job
+
+        try:
+            if isinstance(uploaded_file, (str, os.PathLike)):
+                job.input_path = os.fspath(uploaded_file)
+            else:
+                # El hash de la copia se reutiliza como clave del caché de landmarks
+                job.input_path, job.content_hash = spool_upload(uploaded_file)
+                job.owns_input = True
+        except BaseException:
+            with self._lock:
+                del self._jobs[job.id]
+            raise
+
+        job.future = self._executor.submit(self._run, job)
+        return job.id
+
+    def _run(self, job):
+        if job.cancel_event.is_set():
+            self._finish(job, CANCELLED)
+            return
+
+        job.status = RUNNING
+        try:
+            detector = self.detector_factory()
+            job.result = detector.process_video(job.input_path, job.peso_persona,
+                                                progress_callback=lambda *args: self._progress(job, *args),
+                                                content_hash=job.content_hash, **job.options)
+            job.stats = dict(detector.last_run)
+            job.profile = detector.last_profile
+            self._finish(job, DONE)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as exc:
+            job.error = exc
+            self._finish(job, FAILED)
+
+    # progress_callback de process_video: guarda el avance y una vista previa
+    # reducida como mucho preview_fps veces por segundo; corta si se canceló
+    def _progress(self, job, index, total, image_np, com):
+        if job.cancel_event.is_set():
+            raise JobCancelled()
+        job.progress = (index + 1, total)
+        if com is not None:
+            job.com_rows.append((index, com[0], com[1]))
+
+        now = time.perf_counter()
+        if now - job._last_preview >= self.preview_interval:
+            job._last_preview = now
+            step = max(1, math.ceil(image_np.shape[1] / self.preview_width))
+            job.preview = image_np[::step, ::step].copy()
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished = time.time()
+        if job.owns_input and os.path.exists(job.input_path):
+            os.remove(job.input_path)
+        if status != DONE and job.result and os.path.exists(job.result):
+            os.remove(job.result)
+            job.result = None
+
+    # Trabajo por id, o None si no existe
+    def get(self, job_id):
+        self._evict_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    # Ruta del video procesado si el trabajo terminó bien, si no None
+    def result(self, job_id):
+        job = self.get(job_id)
+        return job.result if job is not None and job.status == DONE else None
+
+    # Trabajos de un usuario, del más reciente al más antiguo
+    def jobs_for(self, user_id):
+        self._evict_expired()
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.user_id == user_id]
+        return sorted(jobs, key=lambda job: job.created, reverse=True)
+
+    # Pide cancelar un trabajo; si todavía no empezó no llega a ejecutarse
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.status not in ACTIVE_STATES:
+            return False
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED)
+        return True
+
+    # Olvida un trabajo terminado y borra su video procesado
+    def remove(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in ACTIVE_STATES:
+                return False
+            del self._jobs[job_id]
+        self._discard_result(job)
+        return True
+
+    # Olvida los trabajos terminados hace más de finished_ttl segundos
+    def _evict_expired(self):
+        limit = time.time() - self.finished_ttl
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.status not in ACTIVE_STATES and job.finished is not None and job.finished < limit]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            self._discard_result(job)
+
+    @staticmethod
+    def _discard_result(job):
+        if job.result and os.path.exists(job.result):
+            os.remove(job.result)
+
+
+_shared_manager = None
+_shared_lock = threading.Lock()
+
+
+# Administrador de trabajos compartido por todas las sesiones del proceso
+def shared_job_manager(detector_factory, **kwargs):
+    global _shared_manager
+    with _shared_lock:
+        if _shared_manager is None:
+            _shared_manager = JobManager(detector_factory, **kwargs)
+        return _shared_manager
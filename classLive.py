@@ -0,0 +1,114 @@
+import sys
+import threading
+import time
+
+# Formato de captura de cámaras de FFmpeg según el sistema operativo
+CAMERA_FORMATS = {'linux': 'v4l2', 'darwin': 'avfoundation', 'win32': 'dshow'}
+
+
+# Abre una fuente en vivo con PyAV. `source` puede ser:
+#   - un entero o 'camera:N': la cámara N del sistema
+#   - una URL rtsp://, rtmp://, udp://, http://...: se abre con poco buffer
+#   - '-': video por la entrada estándar (p. ej. ffmpeg ... -f mpegts - | ...)
+#   - cualquier otra ruta: un archivo o un pipe con nombre
+# Devuelve (contenedor, es_archivo); los archivos se reproducen luego a velocidad real.
+def open_live_source(source):
+    import av
+
+    if isinstance(source, int) or str(source).startswith('camera:'):
+        index = source if isinstance(source, int) else int(str(source).split(':', 1)[1])
+        camera_format = CAMERA_FORMATS.get(sys.platform, 'v4l2')
+        device = f'/dev/video{index}' if camera_format == 'v4l2' else str(index)
+        return av.open(device, format=camera_format), False
+
+    if source == '-':
+        return av.open(sys.stdin.buffer, mode='r'), False
+
+    if '://' in str(source):
+        options = {'fflags': 'nobuffer', 'flags': 'low_delay'}
+        if str(source).startswith('rtsp://'):
+            options['rtsp_transport'] = 'tcp'
+        return av.open(source, options=options, timeout=10.0), False
+
+    return av.open(source), True
+
+
+# Lector en segundo plano que conserva solo el último frame decodificado.
+# Si el procesamiento va más lento que la fuente, los frames viejos se
+# descartan en lugar de acumularse, así la latencia queda acotada a un frame
+# más el tiempo de procesamiento. Con realtime=True (archivos) la lectura se
+# demora según los tiempos del video, como si llegara de una cámara. Con
+# drop_frames=False el lector espera a que se consuma cada frame (sirve para
+# procesar un archivo completo sin descartes).
+class LatestFrameReader:
+    def __init__(self, container, realtime=False, drop_frames=True):
+        self.container = container
+        self.realtime = realtime
+        self.drop_frames = drop_frames
+        self.stream = container.streams.video[0]
+        self.frames = 0
+        self.dropped = 0
+        self._latest = None
+        self._done = False
+        self._error = None
+        self._stop = threading.Event()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._read, name='live-reader', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read(self):
+        try:
+            start = None
+            for frame in self.container.decode(self.stream):
+                if self._stop.is_set():
+                    break
+                if self.realtime and frame.time is not None:
+                    if start is None:
+                        start = time.perf_counter() - frame.time
+                    delay = start + frame.time - time.perf_counter()
+                    if delay > 0 and self._stop.wait(delay):
+                        break
+
+                with self._condition:
+                    if not self.drop_frames:
+                        self._condition.wait_for(lambda: self._latest is None or self._stop.is_set())
+                    # Momento en que el frame está disponible: de aquí se mide la latencia
+                    arrival_ns = time.perf_counter_ns()
+                    if self._latest is not None:
+                        self.dropped += 1
+                    self._latest = (frame, arrival_ns)
+                    self.frames += 1
+                    self._condition.notify()
+        except Exception as exc:
+            self._error = exc
+        finally:
+            with self._condition:
+                self._done = True
+                self._condition.notify()
+
+    # Espera el siguiente frame y devuelve (frame, llegada en ns de perf_counter),
+    # o None cuando la fuente terminó
+    def next(self, timeout=None):
+        with self._condition:
+            self._condition.wait_for(lambda: self._latest is not None or self._done, timeout)
+            if self._latest is None:
+                if self._error is not None:
+                    raise self._error
+                return None
+            latest, self._latest = self._latest, None
+            self._condition.notify()
+            return latest
+
+    def close(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+        self.container.close()
@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+
+from comEngine import LEFT_HIP, LEFT_SHOULDER, NUM_LANDMARKS, RIGHT_HIP, RIGHT_SHOULDER
+
+# Modelo de PoseLandmarker (MediaPipe Tasks). No se incluye en el repositorio:
+# se descarga de https://developers.google.com/mediapipe/solutions/vision/pose_landmarker
+# y se indica con --pose-model, la variable FUNMECA_POSE_MODEL o en models/
+DEFAULT_POSE_MODEL = os.environ.get(
+    'FUNMECA_POSE_MODEL',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'pose_landmarker_full.task'))
+
+# Landmarks del tronco cuyo promedio ubica a cada persona para el seguimiento
+TORSO_LANDMARKS = [LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP]
+
+
+# Detección de varias personas por frame con PoseLandmarker en modo video.
+# Un solo grafo procesa a todas las personas de la imagen a la vez.
+class MultiPoseDetector:
+    def __init__(self, model_path=None, num_poses=4, min_detection_confidence=0.5,
+                 min_tracking_confidence=0.5, min_presence_confidence=0.5):
+        import mediapipe as mp
+        from mediapipe.tasks.python import BaseOptions, vision
+
+        model_path = model_path or DEFAULT_POSE_MODEL
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"No se encontró el modelo de PoseLandmarker: {model_path}")
+
+        options = vision.PoseLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=model_path),
+            running_mode=vision.RunningMode.VIDEO,
+            num_poses=num_poses,
+            min_pose_detection_confidence=min_detection_confidence,
+            min_pose_presence_confidence=min_presence_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+        )
+        self.mp = mp
+        self.landmarker = vision.PoseLandmarker.create_from_options(options)
+        self._last_ms = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.landmarker.close()
+
+    # Detecta a todas las personas de la imagen RGB en `timestamp` (segundos).
+    # Devuelve landmarks (n, 33, 3) y visibilidad (n, 33), con n personas.
+    def detect(self, image_np, timestamp):
+        # El modo video exige marcas de tiempo en ms estrictamente crecientes
+        timestamp_ms = max(int(timestamp * 1000), self._last_ms + 1)
+        self._last_ms = timestamp_ms
+
+        image = self.mp.Image(image_format=self.mp.ImageFormat.SRGB, data=np.ascontiguousarray(image_np))
+        poses = self.landmarker.detect_for_video(image, timestamp_ms).pose_landmarks
+
+        landmarks = np.zeros((len(poses), NUM_LANDMARKS, 3), dtype=np.float32)
+        visibility = np.zeros((len(poses), NUM_LANDMARKS), dtype=np.float32)
+        for i, pose in enumerate(poses):
+            landmarks[i] = [(lm.x, lm.y, lm.z) for lm in pose]
+            visibility[i] = [lm.visibility or 0.0 for lm in pose]
+        return landmarks, visibility
+
+
+# Asigna un identificador estable a cada persona entre frames.
+# Cada track guarda la posición del centro del tronco; las detecciones nuevas se
+# emparejan con los tracks de forma voraz, del par más cercano al más lejano,
+# si están a menos de max_distance (coordenadas normalizadas). Un track que no
+# se ve durante más de max_missed frames se descarta.
+class PoseTracker:
+    def __init__(self, max_distance=0.15, max_missed=15):
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.tracks = {}
+        self._next_id = 1
+
+    # Devuelve la lista de track IDs, en el orden de las detecciones
+    def update(self, landmarks):
+        anchors = landmarks[:, TORSO_LANDMARKS, :2].mean(axis=1)
+        track_ids = list(self.tracks)
+        assigned = [None] * len(anchors)
+
+        if track_ids and len(anchors):
+            previous = np.array([self.tracks[track_id][0] for track_id in track_ids])
+            distances = np.linalg.norm(anchors[:, np.newaxis] - previous[np.newaxis], axis=2)
+            used = set()
+            for flat in np.argsort(distances, axis=None):
+                detection, track = divmod(int(flat), len(track_ids))
+                if distances[detection, track] > self.max_distance:
+                    break
+                if assigned[detection] is None and track not in used:
+                    assigned[detection] = track_ids[track]
+                    used.add(track)
+
+        for detection, track_id in enumerate(assigned):
+            if track_id is None:
+                track_id = assigned[detection] = self._next_id
+                self._next_id += 1
+            self.tracks[track_id] = (anchors[detection], 0)
+
+        # Tracks no vistos en este frame
+        seen = set(assigned)
+        for track_id in track_ids:
+            if track_id not in seen:
+                anchor, missed = self.tracks[track_id]
+                if missed >= self.max_missed:
+                    del self.tracks[track_id]
+                else:
+                    self.tracks[track_id] = (anchor, missed + 1)
+        return assigned
@@ -0,0 +1,174 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import av
+
+from classEncoder import DEFAULT_ENCODER_PROFILE, add_output_stream
+from classFilter import LandmarkFilter
+from classFrames import FrameBufferPool
+from classROI import RegionTracker
+from comEngine import DEFAULT_SEGMENT_MODEL
+
+
+# Lista los pts de los keyframes del stream de video sin decodificar nada
+def keyframe_pts(path):
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        keyframes = []
+        last_pts = 0
+        for packet in container.demux(stream):
+            if packet.pts is None:
+                continue
+            if packet.is_keyframe:
+                keyframes.append(packet.pts)
+            last_pts = max(last_pts, packet.pts + (packet.duration or 0))
+        return sorted(keyframes), last_pts, stream.time_base
+
+
+# Divide el video en segmentos alineados a keyframes.
+# Cada segmento es (decode_from, start, end) en pts: desde decode_from hasta start
+# solo se calienta el tracker de MediaPipe; de start a end se generan frames.
+def plan_segments(keyframes, end_pts, time_base, n_segments, warmup_seconds=1.0):
+    if not keyframes:
+        return [(None, None, None)]
+
+    target = [keyframes[0] + (end_pts - keyframes[0]) * i / n_segments for i in range(n_segments)]
+    starts = sorted({min(keyframes, key=lambda k: abs(k - t)) for t in target})
+    warmup_pts = int(warmup_seconds / time_base)
+
+    segments = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else None
+        if i == 0:
+            segments.append((None, None, end))
+            continue
+        earlier = [k for k in keyframes if k <= start - warmup_pts]
+        decode_from = earlier[-1] if earlier else keyframes[0]
+        segments.append((decode_from, start, end))
+    return segments
+
+
+# Trabajo de un proceso: anota un segmento con su propio grafo de Pose
+def _process_segment(input_path, output_path, segment, peso_persona, encoder_profile=DEFAULT_ENCODER_PROFILE,
+                     segment_model=DEFAULT_SEGMENT_MODEL, smoothing=True, inference_size=None,
+                     roi_tracking=False):
+    from master import CenterOfMassDetector
+
+    detector = CenterOfMassDetector(segment_model=segment_model)
+    decode_from, start, end = segment
+
+    input_container = av.open(input_path)
+    output_container = av.open(output_path, mode='w')
+    input_stream = input_container.streams.video[0]
+
+    output_stream = add_output_stream(output_container, input_stream.width, input_stream.height,
+                                      input_stream.average_rate, encoder_profile)
+
+    if decode_from is not None:
+        input_container.seek(decode_from, stream=input_stream, backward=True)
+
+    frame_pool = FrameBufferPool(input_stream.width, input_stream.height)
+    smoother = LandmarkFilter() if smoothing else None
+    region = RegionTracker(inference_size, roi_tracking)
+    frames = 0
+    with detector.mp_pose.Pose(**detector.pose_options) as pose:
+        for frame in input_container.decode(input_stream):
+            if end is not None and frame.pts is not None and frame.pts >= end:
+                break
+
+            buffer = frame_pool.load(frame)
+            image_np = buffer.array
+
+            # Los frames de calentamiento solo alimentan al tracker y al filtro
+            if start is not None and frame.pts is not None and frame.pts < start:
+                detection = detector.detect_landmarks(pose, frame_pool.contiguous(image_np), region)
+                if smoother is not None:
+                    smoother.update(detection, frame.time)
+                continue
+
+            detector.annotate_frame(pose, image_np, peso_persona, smoother, frame.time, region, frame_pool)
+
+            for packet in output_stream.encode(buffer.frame):
+                output_container.mux(packet)
+            frames += 1
+
+        for packet in output_stream.encode():
+            output_container.mux(packet)
+
+    output_container.close()
+    input_container.close()
+    return output_path, frames
+
+
+# Une los segmentos codificados, en orden, sin volver a codificar
+def concat_segments(segment_paths, output_path):
+    output_container = av.open(output_path, mode='w')
+    output_stream = None
+    offset = 0
+    last_dts = None
+
+    for path in segment_paths:
+        with av.open(path) as segment:
+            stream = segment.streams.video[0]
+            if output_stream is None:
+                if hasattr(output_container, 'add_stream_from_template'):
+                    output_stream = output_container.add_stream_from_template(stream)
+                else:
+                    output_stream = output_container.add_stream(template=stream)
+
+            packets = [packet for packet in segment.demux(stream) if packet.dts is not None]
+            if not packets:
+                continue
+
+            # Desplaza el segmento para que el dts siga siendo creciente
+            first_dts = min(packet.dts for packet in packets)
+            if last_dts is not None:
+                offset = max(offset, last_dts + 1 - first_dts)
+
+            segment_end = offset
+            for packet in packets:
+                packet.pts += offset
+                packet.dts += offset
+                segment_end = max(segment_end, packet.pts + (packet.duration or 0))
+                last_dts = packet.dts
+                packet.stream = output_stream
+                output_container.mux(packet)
+            offset = segment_end
+
+    output_container.close()
+
+
+# Procesa el video en paralelo: un proceso y un grafo de Pose por segmento.
+# Devuelve la cantidad de frames escritos en output_path.
+def process_video_parallel(input_path, output_path, peso_persona, workers=None, warmup_seconds=1.0,
+                           encoder_profile=DEFAULT_ENCODER_PROFILE, segment_model=DEFAULT_SEGMENT_MODEL,
+                           smoothing=True, inference_size=None, roi_tracking=False):
+    workers = workers or os.cpu_count() or 1
+    keyframes, end_pts, time_base = keyframe_pts(input_path)
+    segments = plan_segments(keyframes, end_pts, time_base, workers, warmup_seconds)
+
+    segment_paths = []
+    for _ in segments:
+        tfile = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
+        tfile.close()
+        segment_paths.append(tfile.name)
+
+    # spawn evita heredar por fork el estado de MediaPipe y de los hilos del servidor
+    context = multiprocessing.get_context('spawn')
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(segments)), mp_context=context) as executor:
+            futures = [
+                executor.submit(_process_segment, input_path, path, segment, peso_persona, encoder_profile,
+                                segment_model, smoothing, inference_size, roi_tracking)
+                for path, segment in zip(segment_paths, segments)
+            ]
+            frames = sum(future.result()[1] for future in futures)
+
+        concat_segments(segment_paths, output_path)
+    finally:
+        for path in segment_paths:
+            os.remove(path)
+
+    return frames
@@ -0,0 +1,97 @@
+import queue
+import threading
+
+# Marca de fin de flujo que recorre las colas entre etapas
+_END = object()
+
+
+# Pipeline de tres etapas: decodificación, procesamiento y codificación.
+# La decodificación y la codificación corren en hilos propios; el procesamiento
+# (MediaPipe) corre en el hilo que llama a run(). Las colas son acotadas, así que
+# una etapa lenta frena a las demás (backpressure) y el orden de frames se mantiene.
+class FramePipeline:
+    def __init__(self, queue_depth=8):
+        if queue_depth < 1:
+            raise ValueError("queue_depth debe ser al menos 1")
+        self.queue_depth = queue_depth
+
+    # process(item) -> item se aplica a cada frame en el hilo que llama
+    def run(self, source, process, sink):
+        self.run_stream(source, lambda items: map(process, items), sink)
+
+    # Igual que run, pero transform recibe el iterable de frames decodificados y
+    # genera los frames procesados; puede retener frames siempre que mantenga el orden
+    def run_stream(self, source, transform, sink):
+        decoded = queue.Queue(maxsize=self.queue_depth)
+        processed = queue.Queue(maxsize=self.queue_depth)
+        stop = threading.Event()
+        errors = []
+
+        # Encola sin bloquear para siempre si otra etapa ya falló
+        def put(q, item):
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        # Desencola; devuelve _END si otra etapa ya falló
+        def get(q):
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _END
+
+        def decode_stage():
+            try:
+                for item in source:
+                    if not put(decoded, item):
+                        return
+                put(decoded, _END)
+            except BaseException as exc:
+                errors.append(exc)
+                stop.set()
+
+        def encode_stage():
+            try:
+                while True:
+                    item = get(processed)
+                    if item is _END:
+                        return
+                    sink(item)
+            except BaseException as exc:
+                errors.append(exc)
+                stop.set()
+
+        decoder = threading.Thread(target=decode_stage, name="pipeline-decode", daemon=True)
+        encoder = threading.Thread(target=encode_stage, name="pipeline-encode", daemon=True)
+        decoder.start()
+        encoder.start()
+
+        # Frames decodificados hasta el fin del flujo o un error en otra etapa
+        def decoded_items():
+            while True:
+                item = get(decoded)
+                if item is _END:
+                    return
+                yield item
+
+        try:
+            for item in transform(decoded_items()):
+                if not put(processed, item):
+                    break
+            put(processed, _END)
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            encoder.join()
+            stop.set()
+            decoder.join()
+
+        if errors:
+            raise errors[0]
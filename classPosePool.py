@@ -0,0 +1,112 @@
+import contextlib
+import threading
+import time
+
+import numpy as np
+
+
+# Pool de grafos de MediaPipe Pose ya construidos y calentados.
+# Los grafos se agrupan por configuración (confianzas, model_complexity, ...).
+# checkout entrega un grafo de uso exclusivo y checkin lo reinicia antes de
+# devolverlo, así dos sesiones nunca comparten el estado del tracker.
+class PosePool:
+    def __init__(self, max_idle=4, factory=None):
+        self.max_idle = max_idle
+        self.factory = factory
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'created': 0, 'warmup_seconds': 0.0}
+
+    @staticmethod
+    def _key(options):
+        return tuple(sorted(options.items()))
+
+    # Crea un grafo y procesa una imagen vacía para cargar el modelo
+    def _create(self, options):
+        if self.factory is None:
+            # MediaPipe se importa con el primer grafo, no al crear el pool
+            import mediapipe as mp
+
+            self.factory = mp.solutions.pose.Pose
+        start_time = time.perf_counter()
+        pose = self.factory(**options)
+        pose.process(np.zeros((64, 64, 3), dtype=np.uint8))
+        if hasattr(pose, 'reset'):
+            pose.reset()
+        with self._lock:
+            self.stats['created'] += 1
+            self.stats['warmup_seconds'] += time.perf_counter() - start_time
+        return pose
+
+    # Entrega un grafo libre para `options`, o crea uno si no hay
+    def checkout(self, **options):
+        with self._lock:
+            idle = self._idle.get(self._key(options))
+            if idle:
+                self.stats['hits'] += 1
+                return idle.pop()
+            self.stats['misses'] += 1
+        return self._create(options)
+
+    # Devuelve un grafo al pool, con el tracker reiniciado
+    def checkin(self, pose, **options):
+        if hasattr(pose, 'reset'):
+            pose.reset()
+        with self._lock:
+            idle = self._idle.setdefault(self._key(options), [])
+            if len(idle) < self.max_idle:
+                idle.append(pose)
+                return
+        pose.close()
+
+    # Uso como contexto: with pool.pose(**options) as pose: ...
+    # Si el procesamiento falla, el grafo se descarta en lugar de volver al pool.
+    @contextlib.contextmanager
+    def pose(self, **options):
+        pose = self.checkout(**options)
+        try:
+            yield pose
+        except BaseException:
+            pose.close()
+            raise
+        self.checkin(pose, **options)
+
+    # Crea por adelantado `count` grafos para `options`
+    def warm(self, count=1, **options):
+        for pose in [self._create(options) for _ in range(count)]:
+            self.checkin(pose, **options)
+
+    # Métricas del pool: aciertos, fallos, grafos creados y tiempo de calentamiento
+    def report(self):
+        with self._lock:
+            report = dict(self.stats)
+            report['idle'] = sum(len(idle) for idle in self._idle.values())
+        requests = report['hits'] + report['misses']
+        report['hit_rate'] = report['hits'] / requests if requests else 0.0
+        return report
+
+    # Cierra todos los grafos libres
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for poses in idle.values():
+            for pose in poses:
+                pose.close()
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+# Pool compartido por todo el proceso (todas las sesiones de Streamlit).
+# Al crearlo se calientan en segundo plano warm_count grafos para warm_options,
+# así la primera solicitud no paga la construcción del grafo ni bloquea la página.
+def shared_pose_pool(warm_options=None, warm_count=1):
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = PosePool()
+            if warm_options is not None:
+                threading.Thread(target=_shared_pool.warm, args=(warm_count,), kwargs=warm_options,
+                                 name='pose-pool-warm', daemon=True).start()
+        return _shared_pool
@@ -0,0 +1,63 @@
+import math
+import time
+
+import pandas as pd
+
+
+# Vista previa progresiva para Streamlit durante el procesamiento.
+# Se llama una vez por frame, pero solo actualiza la interfaz (barra de progreso,
+# imagen reducida y gráfico del CM) como máximo max_fps veces por segundo, para
+# no saturar el websocket ni frenar el procesamiento. El primer frame se muestra
+# siempre, así el usuario ve algo en el primer segundo.
+class ThrottledPreview:
+    def __init__(self, st, max_fps=4.0, preview_width=480, max_chart_points=2000):
+        self.st = st
+        self.min_interval = 1.0 / max_fps
+        self.preview_width = preview_width
+        self.progress = st.progress(0.0, text="Procesando video...")
+        self.image = st.empty()
+        self.max_chart_points = max_chart_points
+        self.chart = st.empty()
+        self._rows = []
+        self._last_update = None
+        self._index = 0
+        self._total = 0
+
+    # progress_callback de process_video: index y total de frames, imagen RGB
+    # anotada y centro de masa (x, y, z) o None si no se detectó a la persona
+    def __call__(self, index, total, image_np, com):
+        self._index, self._total = index, total
+        if com is not None:
+            self._rows.append((index, com[0], com[1]))
+
+        now = time.perf_counter()
+        if self._last_update is not None and now - self._last_update < self.min_interval:
+            return
+        self._last_update = now
+
+        # Reducción por salto de píxeles: es una vista, no copia la imagen
+        step = max(1, math.ceil(image_np.shape[1] / self.preview_width))
+        self.image.image(image_np[::step, ::step], channels='RGB')
+        self._update_progress()
+        self._draw_chart()
+
+    # Muestra los datos pendientes al terminar
+    def finish(self):
+        self._draw_chart()
+        self.progress.progress(1.0, text="Procesamiento completado.")
+
+    def _update_progress(self):
+        if self._total:
+            fraction = min((self._index + 1) / self._total, 1.0)
+            self.progress.progress(fraction, text=f"Procesando video... {self._index + 1}/{self._total} frames")
+        else:
+            self.progress.progress(0.0, text=f"Procesando video... {self._index + 1} frames")
+
+    # Redibuja el gráfico del CM; con muchos frames se muestra uno de cada N
+    # para que cada actualización envíe a lo sumo max_chart_points puntos
+    def _draw_chart(self):
+        if not self._rows:
+            return
+        step = max(1, math.ceil(len(self._rows) / self.max_chart_points))
+        chart_data = pd.DataFrame(self._rows[::step], columns=['frame', 'com_x', 'com_y']).set_index('frame')
+        self.chart.line_chart(chart_data)
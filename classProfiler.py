@@ -0,0 +1,122 @@
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Cantidad de cubetas del histograma: cubeta i = latencias en [2^i, 2^(i+1)) microsegundos
+HISTOGRAM_BUCKETS = 32
+
+
+# Cada cuántos frames se muestrea la memoria residente
+RSS_SAMPLE_INTERVAL = 10
+
+
+# Memoria residente máxima del proceso en MB (None si no se puede medir).
+# Es el máximo de toda la vida del proceso, no de un video.
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB y macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# Memoria residente actual del proceso en MB, leída de /proc (None fuera de Linux)
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * resource.getpagesize() / (1024 * 1024)
+
+
+# Mide la latencia de cada etapa del pipeline con un histograma logarítmico.
+# Registrar una medición es O(1) y no asigna memoria, así que se puede dejar
+# activo en producción. Cada etapa debe registrarse desde un solo hilo.
+# La memoria máxima del video se obtiene muestreando la memoria residente cada
+# RSS_SAMPLE_INTERVAL frames; si hay varios videos a la vez en el proceso, la
+# medición incluye a los demás. Donde no se puede muestrear (fuera de Linux) se
+# informa el máximo del proceso y 'peak_rss_scope' es 'process'.
+class StageProfiler:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = {}
+        self.frames = 0
+        self._start = time.perf_counter()
+        self._peak_rss = current_rss_mb()
+
+    # Marca de tiempo para pasar luego a record()
+    def clock(self):
+        return time.perf_counter_ns() if self.enabled else 0
+
+    # Registra la duración de `stage` desde `start` (obtenido con clock())
+    def record(self, stage, start):
+        if not self.enabled:
+            return
+        elapsed = time.perf_counter_ns() - start
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = self.stages[stage] = {'count': 0, 'total_ns': 0, 'max_ns': 0,
+                                          'histogram': [0] * HISTOGRAM_BUCKETS}
+        stats['count'] += 1
+        stats['total_ns'] += elapsed
+        if elapsed > stats['max_ns']:
+            stats['max_ns'] = elapsed
+        bucket = min(max(elapsed // 1000, 1).bit_length() - 1, HISTOGRAM_BUCKETS - 1)
+        stats['histogram'][bucket] += 1
+
+    # Cuenta un frame terminado
+    def frame(self):
+        self.frames += 1
+        if self.enabled and self.frames % RSS_SAMPLE_INTERVAL == 0:
+            self._sample_rss()
+
+    def _sample_rss(self):
+        rss = current_rss_mb()
+        if rss is not None and (self._peak_rss is None or rss > self._peak_rss):
+            self._peak_rss = rss
+
+    # Percentil aproximado en ms: límite superior de la cubeta que lo contiene
+    @staticmethod
+    def _percentile_ms(histogram, count, fraction):
+        target = fraction * count
+        seen = 0
+        for bucket, n in enumerate(histogram):
+            seen += n
+            if seen >= target:
+                return (2 ** (bucket + 1)) / 1000
+        return (2 ** HISTOGRAM_BUCKETS) / 1000
+
+    # Reporte estructurado: frames/s, memoria y latencia por etapa
+    def report(self):
+        wall = time.perf_counter() - self._start
+        stages = {}
+        for name, stats in self.stages.items():
+            count = stats['count']
+            stages[name] = {
+                'count': count,
+                'total_s': stats['total_ns'] / 1e9,
+                'mean_ms': stats['total_ns'] / count / 1e6,
+                'p50_ms': self._percentile_ms(stats['histogram'], count, 0.50),
+                'p95_ms': self._percentile_ms(stats['histogram'], count, 0.95),
+                'p99_ms': self._percentile_ms(stats['histogram'], count, 0.99),
+                'max_ms': stats['max_ns'] / 1e6,
+                'histogram_us_log2': list(stats['histogram']),
+            }
+        self._sample_rss()
+        return {
+            'frames': self.frames,
+            'wall_s': wall,
+            'fps': self.frames / wall if wall > 0 else 0.0,
+            'peak_rss_mb': self._peak_rss if self._peak_rss is not None else peak_rss_mb(),
+            'peak_rss_scope': 'job' if self._peak_rss is not None else 'process',
+            'stages': stages,
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.report(), **kwargs)
@@ -0,0 +1,104 @@
+import cv2
+import numpy as np
+
+
+# Prepara la imagen que recibe MediaPipe: recorta una ventana alrededor de la
+# persona (a partir de los landmarks del frame anterior) y la reduce para que su
+# lado mayor no supere inference_size. Los landmarks detectados en esa ventana se
+# devuelven en coordenadas normalizadas del frame completo.
+# La ventana solo se mueve cuando la persona se acerca a menos de edge_margin
+# (fracción de su tamaño) de un borde: el tracker de MediaPipe guarda su propia
+# región en coordenadas de la imagen anterior, así que cada movimiento de la
+# ventana obliga a reiniciarlo (ver `moved`).
+class RegionTracker:
+    def __init__(self, inference_size=None, roi_tracking=False, padding=0.3, min_visibility=0.5,
+                 min_fraction=0.25, edge_margin=0.1):
+        self.inference_size = inference_size
+        self.roi_tracking = roi_tracking
+        self.padding = padding
+        self.min_visibility = min_visibility
+        # Tamaño mínimo de la ventana como fracción del frame, para no encogerla sin fin
+        self.min_fraction = min_fraction
+        self.edge_margin = edge_margin
+        # Ventana (x0, y0, x1, y1) en píxeles para el siguiente frame; None = frame completo
+        self.window = None
+        # Ventana usada en el frame anterior y si la del último prepare() es distinta
+        self._last_window = None
+        self.moved = False
+
+    # Indica si hace falta recortar o reducir algún frame
+    def enabled(self):
+        return bool(self.inference_size) or self.roi_tracking
+
+    # Devuelve (imagen para MediaPipe, ventana usada)
+    def prepare(self, image_np):
+        height, width, _ = image_np.shape
+        x0, y0, x1, y1 = self.window or (0, 0, width, height)
+        crop = image_np[y0:y1, x0:x1]
+        self.moved = self._last_window is not None and (x0, y0, x1, y1) != self._last_window
+        self._last_window = (x0, y0, x1, y1)
+
+        crop_height, crop_width = y1 - y0, x1 - x0
+        if self.inference_size and max(crop_width, crop_height) > self.inference_size:
+            scale = self.inference_size / max(crop_width, crop_height)
+            size = (max(1, round(crop_width * scale)), max(1, round(crop_height * scale)))
+            crop = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+
+        return crop, (x0, y0, x1, y1)
+
+    # Pasa los landmarks de la ventana al frame completo y actualiza la ventana
+    def map_back(self, detection, window, image_shape):
+        height, width, _ = image_shape
+        if detection is None:
+            self.window = None
+            return None
+
+        landmarks, visibility = detection
+        x0, y0, x1, y1 = window
+        scale = np.array([(x1 - x0) / width, (y1 - y0) / height, (x1 - x0) / width], dtype=np.float32)
+        offset = np.array([x0 / width, y0 / height, 0.0], dtype=np.float32)
+        landmarks = landmarks * scale + offset
+
+        if self.roi_tracking:
+            self.window = self._next_window(landmarks, visibility, width, height)
+        return landmarks, visibility
+
+    # Caja de los landmarks visibles, con margen y recortada al frame
+    def _next_window(self, landmarks, visibility, width, height):
+        visible = visibility >= self.min_visibility
+        if visible.sum() < 2:
+            return None
+
+        xs = landmarks[visible, 0] * width
+        ys = landmarks[visible, 1] * height
+        size = max(xs.max() - xs.min(), ys.max() - ys.min())
+        if self.window is not None and self._inside(self.window, xs, ys, self.edge_margin * size, width, height):
+            return self.window
+
+        margin = self.padding * size
+        x0, x1 = self._span(xs.min() - margin, xs.max() + margin, width)
+        y0, y1 = self._span(ys.min() - margin, ys.max() + margin, height)
+        if x0 == 0 and y0 == 0 and x1 == width and y1 == height:
+            return None
+        return x0, y0, x1, y1
+
+    # Indica si los puntos quedan a más de `margin` de los bordes de la ventana
+    # (los bordes que coinciden con el frame no cuentan: la ventana no puede crecer)
+    @staticmethod
+    def _inside(window, xs, ys, margin, width, height):
+        x0, y0, x1, y1 = window
+        return ((x0 == 0 or xs.min() - margin >= x0) and (y0 == 0 or ys.min() - margin >= y0) and
+                (x1 == width or xs.max() + margin <= x1) and (y1 == height or ys.max() + margin <= y1))
+
+    # Intervalo [start, end) en píxeles, con el tamaño mínimo y dentro del frame
+    def _span(self, start, end, size):
+        length = min(size, max(end - start, self.min_fraction * size))
+        center = (start + end) / 2
+        start = int(np.clip(center - length / 2, 0, size - length))
+        return start, int(min(size, start + np.ceil(length)))
+
+# Opciones del RegionTracker que cambian los landmarks y deben ir en la clave del caché
+def region_cache_options(region):
+    if not region.enabled():
+        return {}
+    return {'inference_size': region.inference_size, 'roi_tracking': region.roi_tracking}
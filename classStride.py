@@ -0,0 +1,86 @@
+import numpy as np
+
+from comEngine import SEGMENT_WEIGHTS, center_of_mass_batch
+
+
+# Interpola linealmente landmarks y visibilidad entre dos detecciones
+def interpolate_detection(start, end, t):
+    landmarks = (1 - t) * start[0] + t * end[0]
+    visibility = (1 - t) * start[1] + t * end[1]
+    return landmarks.astype(np.float32), visibility.astype(np.float32)
+
+
+# Ejecuta la detección de pose solo cada `stride` frames e interpola los demás.
+# Con adaptive=True el paso se ajusta según cuánto se movió el centro de masa
+# entre las dos últimas inferencias: poco movimiento alarga el paso (hasta
+# max_stride) y mucho movimiento lo acorta (hasta 1). Los frames salteados se
+# retienen hasta la siguiente inferencia, así que la salida se retrasa a lo sumo
+# max_stride frames pero mantiene el orden. segment_weights es la matriz del
+# modelo segmental con que se mide el movimiento del CM (la del detector).
+class StridedDetector:
+    def __init__(self, stride=1, adaptive=False, max_stride=8, motion_threshold=0.005,
+                 segment_weights=SEGMENT_WEIGHTS):
+        if stride < 1:
+            raise ValueError("stride debe ser al menos 1")
+        self.stride = stride
+        self.adaptive = adaptive
+        self.max_stride = max(max_stride, stride)
+        self.motion_threshold = motion_threshold
+        self.segment_weights = segment_weights
+        self.frames = 0
+        self.inferred = 0
+
+    # Frames que pueden quedar retenidos a la vez esperando la siguiente inferencia
+    def max_delay(self):
+        return self.max_stride if self.adaptive else self.stride
+
+    # Siguiente paso a partir del desplazamiento del CM por frame
+    def _next_stride(self, previous, current, gap):
+        if not self.adaptive or previous is None or current is None:
+            return self.stride
+        com = center_of_mass_batch(np.stack([previous[0], current[0]]), self.segment_weights)
+        motion = np.linalg.norm(com[1] - com[0]) / gap
+        if motion <= 0:
+            return self.max_stride
+        return int(np.clip(round(self.motion_threshold / motion), 1, self.max_stride))
+
+    # Recorre `items` y genera (item, detección) por frame.
+    # detect(item) devuelve (landmarks, visibilidad) o None.
+    def run(self, items, detect):
+        stride = self.stride
+        last = None
+        pending = []
+
+        for item in items:
+            self.frames += 1
+            if last is not None and len(pending) + 1 < stride:
+                pending.append(item)
+                continue
+
+            detection = detect(item)
+            self.inferred += 1
+            yield from self._flush(last, pending, detection)
+            yield item, detection
+
+            if last is not None:
+                stride = self._next_stride(last[1], detection, len(pending) + 1)
+            last = (item, detection)
+            pending = []
+
+        # Al final se infiere el último frame retenido para cerrar la interpolación
+        if pending:
+            final = pending.pop()
+            detection = detect(final)
+            self.inferred += 1
+            yield from self._flush(last, pending, detection)
+            yield final, detection
+
+    # Genera los frames retenidos con la detección interpolada
+    def _flush(self, last, pending, detection):
+        start = last[1] if last is not None else None
+        gap = len(pending) + 1
+        for i, item in enumerate(pending, start=1):
+            if start is not None and detection is not None:
+                yield item, interpolate_detection(start, detection, i / gap)
+            else:
+                yield item, None
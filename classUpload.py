@@ -0,0 +1,36 @@
+import hashlib
+import shutil
+import tempfile
+
+# Tamaño de bloque para copiar y leer archivos subidos
+CHUNK_SIZE = 1024 * 1024
+
+
+# Lee un archivo subido por bloques y calcula su hash, sin cargarlo entero en memoria
+class _HashingReader:
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        chunk = self.fileobj.read(size)
+        self.digest.update(chunk)
+        return chunk
+
+
+# Copia el archivo subido a un archivo temporal por bloques de CHUNK_SIZE.
+# Devuelve la ruta del archivo temporal y el SHA-256 de su contenido.
+def spool_upload(uploaded_file, suffix='.mp4'):
+    reader = _HashingReader(uploaded_file)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tfile:
+        shutil.copyfileobj(reader, tfile, CHUNK_SIZE)
+    return tfile.name, reader.digest.hexdigest()
+
+
+# SHA-256 de un archivo subido leído por bloques; deja el cursor al inicio
+def upload_sha256(uploaded_file):
+    reader = _HashingReader(uploaded_file)
+    while reader.read(CHUNK_SIZE):
+        pass
+    uploaded_file.seek(0)
+    return reader.digest.hexdigest()
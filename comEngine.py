@@ -0,0 +1,144 @@
+import numpy as np
+
+# Índices de los landmarks de MediaPipe Pose (mp.solutions.pose.PoseLandmark).
+# Se definen aquí para no resolver el enum en cada frame.
+NUM_LANDMARKS = 33
+NOSE = 0
+LEFT_EAR = 7
+RIGHT_EAR = 8
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_ELBOW = 13
+RIGHT_ELBOW = 14
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+LEFT_PINKY = 17
+RIGHT_PINKY = 18
+LEFT_INDEX = 19
+RIGHT_INDEX = 20
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+RIGHT_KNEE = 26
+LEFT_ANKLE = 27
+RIGHT_ANKLE = 28
+LEFT_HEEL = 29
+RIGHT_HEEL = 30
+LEFT_FOOT_INDEX = 31
+RIGHT_FOOT_INDEX = 32
+
+# Puntos anatómicos que no son landmarks: se toman como el promedio de varios
+MID_SHOULDERS = (LEFT_SHOULDER, RIGHT_SHOULDER)
+MID_HIPS = (LEFT_HIP, RIGHT_HIP)
+MID_EARS = (LEFT_EAR, RIGHT_EAR)
+LEFT_KNUCKLES = (LEFT_INDEX, LEFT_PINKY)
+RIGHT_KNUCKLES = (RIGHT_INDEX, RIGHT_PINKY)
+
+
+# Segmentos de ambos lados del cuerpo: (nombre, fracción de masa, extremo
+# proximal, extremo distal, posición del centro del segmento medida desde el
+# extremo proximal como fracción de su longitud)
+def _bilateral(name, mass, left, right, ratio):
+    return [(f'left_{name}', mass, left[0], left[1], ratio),
+            (f'right_{name}', mass, right[0], right[1], ratio)]
+
+
+# Modelos segmentales del cuerpo completo. MediaPipe no marca el vértice de la
+# cabeza ni C7, así que la cabeza va de los hombros a las orejas y su centro se
+# ubica a la altura del conducto auditivo.
+SEGMENT_MODELS = {
+    # Dempster (1955), tabla de Winter, Biomechanics and Motor Control of Human Movement
+    'dempster': [
+        ('head_neck', 0.081, MID_SHOULDERS, MID_EARS, 1.0),
+        ('trunk', 0.497, MID_SHOULDERS, MID_HIPS, 0.50),
+        *_bilateral('upper_arm', 0.028, (LEFT_SHOULDER, LEFT_ELBOW), (RIGHT_SHOULDER, RIGHT_ELBOW), 0.436),
+        *_bilateral('forearm', 0.016, (LEFT_ELBOW, LEFT_WRIST), (RIGHT_ELBOW, RIGHT_WRIST), 0.430),
+        *_bilateral('hand', 0.006, (LEFT_WRIST, LEFT_KNUCKLES), (RIGHT_WRIST, RIGHT_KNUCKLES), 0.506),
+        *_bilateral('thigh', 0.100, (LEFT_HIP, LEFT_KNEE), (RIGHT_HIP, RIGHT_KNEE), 0.433),
+        *_bilateral('shank', 0.0465, (LEFT_KNEE, LEFT_ANKLE), (RIGHT_KNEE, RIGHT_ANKLE), 0.433),
+        *_bilateral('foot', 0.0145, (LEFT_ANKLE, LEFT_FOOT_INDEX), (RIGHT_ANKLE, RIGHT_FOOT_INDEX), 0.50),
+    ],
+    # de Leva (1996), parámetros de Zatsiorsky-Seluyanov ajustados, hombres
+    'de_leva': [
+        ('head_neck', 0.0694, MID_SHOULDERS, MID_EARS, 1.0),
+        ('trunk', 0.4346, MID_SHOULDERS, MID_HIPS, 0.4486),
+        *_bilateral('upper_arm', 0.0271, (LEFT_SHOULDER, LEFT_ELBOW), (RIGHT_SHOULDER, RIGHT_ELBOW), 0.5772),
+        *_bilateral('forearm', 0.0162, (LEFT_ELBOW, LEFT_WRIST), (RIGHT_ELBOW, RIGHT_WRIST), 0.4574),
+        *_bilateral('hand', 0.0061, (LEFT_WRIST, LEFT_KNUCKLES), (RIGHT_WRIST, RIGHT_KNUCKLES), 0.7900),
+        *_bilateral('thigh', 0.1416, (LEFT_HIP, LEFT_KNEE), (RIGHT_HIP, RIGHT_KNEE), 0.4095),
+        *_bilateral('shank', 0.0433, (LEFT_KNEE, LEFT_ANKLE), (RIGHT_KNEE, RIGHT_ANKLE), 0.4459),
+        *_bilateral('foot', 0.0137, (LEFT_HEEL, LEFT_FOOT_INDEX), (RIGHT_HEEL, RIGHT_FOOT_INDEX), 0.4415),
+    ],
+}
+DEFAULT_SEGMENT_MODEL = 'dempster'
+
+
+# Suma `fraction` repartido en partes iguales entre los landmarks del punto
+def _add_point(row, point, fraction):
+    points = point if isinstance(point, tuple) else (point,)
+    for index in points:
+        row[index] += fraction / len(points)
+
+
+# Compila un modelo segmental en arrays, una sola vez:
+# centers (n_segmentos, 33) con la combinación de landmarks que da el centro de
+# cada segmento, y masses (n_segmentos,) con las fracciones de masa normalizadas
+def compile_segment_model(segments):
+    names = [name for name, *_ in segments]
+    centers = np.zeros((len(segments), NUM_LANDMARKS), dtype=np.float64)
+    masses = np.array([mass for _, mass, *_ in segments], dtype=np.float64)
+    for row, (_, _, proximal, distal, ratio) in zip(centers, segments):
+        _add_point(row, proximal, 1.0 - ratio)
+        _add_point(row, distal, ratio)
+    return names, centers, masses / masses.sum()
+
+
+# Construye la matriz de pesos (33, 3): columna por eje, fila por landmark.
+# El CM es lineal en los landmarks, así que todo el modelo se reduce a esta
+# matriz y el costo por frame no depende de la cantidad de segmentos.
+# El peso de la persona se cancela en el promedio, por eso no aparece aquí.
+def build_segment_weights(segments=SEGMENT_MODELS[DEFAULT_SEGMENT_MODEL]):
+    _, centers, masses = compile_segment_model(segments)
+    return np.repeat((masses @ centers)[:, np.newaxis], 3, axis=1)
+
+
+SEGMENT_MODEL_WEIGHTS = {name: build_segment_weights(segments) for name, segments in SEGMENT_MODELS.items()}
+SEGMENT_WEIGHTS = SEGMENT_MODEL_WEIGHTS[DEFAULT_SEGMENT_MODEL]
+
+
+# Matriz de pesos de un modelo por nombre
+def segment_model_weights(model=DEFAULT_SEGMENT_MODEL):
+    if model not in SEGMENT_MODEL_WEIGHTS:
+        raise ValueError(f"Modelo segmental desconocido: {model} (opciones: {', '.join(SEGMENT_MODELS)})")
+    return SEGMENT_MODEL_WEIGHTS[model]
+
+
+# Convierte los landmarks de MediaPipe en un array (33, 3) de float32
+def landmarks_to_array(landmarks):
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float32)
+
+
+# Visibilidad de cada landmark de MediaPipe como array (33,) de float32
+def landmarks_visibility(landmarks):
+    return np.array([lm.visibility for lm in landmarks], dtype=np.float32)
+
+
+# Apila las detecciones por frame ((landmarks, visibilidad) o None) en arrays:
+# landmarks (n, 33, 3), visibility (n, 33) y detected (n,) con los frames detectados
+def stack_detections(detections):
+    n_frames = len(detections)
+    landmarks = np.zeros((n_frames, NUM_LANDMARKS, 3), dtype=np.float32)
+    visibility = np.zeros((n_frames, NUM_LANDMARKS), dtype=np.float32)
+    detected = np.zeros(n_frames, dtype=bool)
+    for i, detection in enumerate(detections):
+        if detection is not None:
+            landmarks[i], visibility[i] = detection
+            detected[i] = True
+    return landmarks, visibility, detected
+
+
+# Calcula el centro de masa de todos los frames a la vez.
+# landmarks: array (n_frames, 33, 3); devuelve un array (n_frames, 3) con X, Y, Z.
+def center_of_mass_batch(landmarks, weights=SEGMENT_WEIGHTS):
+    landmarks = np.asarray(landmarks)
+    return np.einsum('fja,ja->fa', landmarks[..., :3], weights, dtype=np.float64)
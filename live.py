@@ -0,0 +1,52 @@
+import argparse
+import sys
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Centro de masa en vivo desde una cámara, una URL RTSP, un pipe o un archivo.")
+    parser.add_argument('source', help="camera:N, rtsp://..., '-' para la entrada estándar, o un archivo de video")
+    parser.add_argument('--peso', type=float, default=70.0, help="Peso de la persona en kg")
+    parser.add_argument('--duration', type=float, help="Segundos de procesamiento (por defecto hasta el final)")
+    parser.add_argument('--max-frames', type=int, help="Cantidad máxima de frames procesados")
+    parser.add_argument('--no-realtime', action='store_true',
+                        help="Lee los archivos lo más rápido posible en lugar de a velocidad real")
+    parser.add_argument('--inference-size', type=int,
+                        help="Lado mayor máximo (px) de la imagen que recibe MediaPipe")
+    parser.add_argument('--no-smoothing', action='store_true',
+                        help="No aplica el filtro temporal (One-Euro) a los landmarks")
+    parser.add_argument('-o', '--output', help="Graba los frames anotados en este video")
+    parser.add_argument('--quiet', action='store_true', help="No imprime una línea por frame")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    from master import CenterOfMassDetector
+
+    # Una línea CSV por frame: índice, CM y latencia
+    def print_sample(index, image_np, com, latency_ms):
+        if args.quiet:
+            return
+        cm_x, cm_y, cm_z = com if com is not None else ('', '', '')
+        print(f"{index},{cm_x},{cm_y},{cm_z},{latency_ms:.1f}", flush=True)
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    detector = CenterOfMassDetector()
+    if not args.quiet:
+        print("frame,com_x,com_y,com_z,latency_ms")
+    stats = detector.process_live(source, args.peso, frame_callback=print_sample, max_frames=args.max_frames,
+                                  duration=args.duration, realtime=False if args.no_realtime else None,
+                                  inference_size=args.inference_size, smoothing=not args.no_smoothing,
+                                  output_path=args.output)
+
+    print(f"Procesados {stats['frames']} de {stats['source_frames']} frames "
+          f"({stats['dropped_frames']} descartados), {stats['fps']:.1f} frames/s, latencia p50 "
+          f"{stats['latency_p50_ms']:.1f} ms, p95 {stats['latency_p95_ms']:.1f} ms, "
+          f"máx {stats['latency_max_ms']:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
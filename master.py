@@ -1,195 +1,1011 @@
-import mediapipe as mp
-import streamlit as st
+# mediapipe, av, cv2 y pandas (y los módulos que los usan) se importan dentro de
+# los métodos que procesan video: así las páginas de documentación y el arranque
+# en frío no pagan su costo de importación (ver benchmarks/bench_startup.py)
 import tempfile
-import av
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
-import cv2
+from comEngine import (DEFAULT_SEGMENT_MODEL, NUM_LANDMARKS, center_of_mass_batch, landmarks_to_array,
+                       landmarks_visibility, segment_model_weights, stack_detections)
+from classExport import com_series_columns, write_com_series
+from classCache import LandmarkCache, file_sha256
+from classUpload import spool_upload as spool_upload_to_file, upload_sha256
+from classPipeline import FramePipeline
+from classStride import StridedDetector
+from classPosePool import shared_pose_pool
+from classProfiler import StageProfiler
+from classEncoder import DEFAULT_ENCODER_PROFILE, ENCODER_PROFILES, add_output_stream, select_encoder
+from classFilter import LandmarkFilter
+from classMultiPose import DEFAULT_POSE_MODEL
+from classJobs import ACTIVE_STATES, CANCELLED, DONE, QUEUED, JobLimitExceeded, shared_job_manager
+from fractions import Fraction
+import functools
 import os
+import contextlib
+import json
+import time
+import math
+import uuid
+
+# Opciones de Pose por defecto. Umbrales bajos (los de MediaPipe por defecto): el
+# filtro temporal se encarga del temblor, así se pierden menos frames y hay menos
+# redetecciones
+DEFAULT_POSE_OPTIONS = dict(min_detection_confidence=0.5, min_tracking_confidence=0.5)
 
 # Clase encargada de la detección del centro de masa
 class CenterOfMassDetector:
-    def __init__(self):
-        self.mp_pose = mp.solutions.pose
-        self.mp_drawing = mp.solutions.drawing_utils
+    def __init__(self, landmark_cache=None, pose_pool=None, segment_model=DEFAULT_SEGMENT_MODEL):
+        self.pose_options = dict(DEFAULT_POSE_OPTIONS)
+        # Caché opcional de landmarks (LandmarkCache) para no repetir la inferencia
+        self.landmark_cache = landmark_cache
+        # Pool opcional de grafos de Pose ya calentados (PosePool)
+        self.pose_pool = pose_pool
+        # Modelo segmental del CM (ver comEngine.SEGMENT_MODELS), compilado a una matriz de pesos
+        self.segment_model = segment_model
+        self.segment_weights = segment_model_weights(segment_model)
+        # Contadores de asignaciones de memoria por frame del último video
+        self.frame_stats = {}
+        # Frames, duración y velocidad del último video procesado
+        self.last_run = {}
+        # Perfil por etapa (latencias, frames/s, memoria) del último video
+        self.last_profile = {}
+        # Frames en los que se ejecutó MediaPipe en el último análisis
+        self.last_inferred_frames = 0
+
+    # MediaPipe se importa recién cuando hace falta detectar o dibujar poses
+    @functools.cached_property
+    def mp_pose(self):
+        import mediapipe as mp
+        return mp.solutions.pose
+
+    @functools.cached_property
+    def mp_drawing(self):
+        import mediapipe as mp
+        return mp.solutions.drawing_utils
+
+    @functools.cached_property
+    def pose_connections(self):
+        return list(self.mp_pose.POSE_CONNECTIONS)
+
+    # Grafo de Pose para un video: del pool si hay uno, o uno nuevo
+    def pose_session(self):
+        if self.pose_pool is not None:
+            return self.pose_pool.pose(**self.pose_options)
+        return self.mp_pose.Pose(**self.pose_options)
 
     # Función para calcular el centro de un segmento
     def segment_center(self, point1, point2):
         return [(point1[0] + point2[0]) / 2, (point1[1] + point2[1]) / 2, (point1[2] + point2[2]) / 2]
 
-    # Función para calcular el centro de masa (CM)
+    # Función para calcular el centro de masa (CM) de un solo frame.
+    # Es un envoltorio de center_of_mass_batch; el peso se cancela en el promedio.
     def calculate_center_of_mass(self, landmarks, peso_persona):
-        # Relación de masas por segmentos del cuerpo (valores aproximados)
-        segment_mass_ratios = {
-            'head': 0.08,
-            'torso': 0.5,
-            'upper_arm': 0.03,
-            'lower_arm': 0.02,
-            'thigh': 0.1,
-            'lower_leg': 0.05
-        }
+        if not isinstance(landmarks, np.ndarray):
+            landmarks = landmarks_to_array(landmarks)
+        cm_x, cm_y, cm_z = center_of_mass_batch(landmarks[np.newaxis], self.segment_weights)[0]
+        return float(cm_x), float(cm_y), float(cm_z)
 
-        # Extraer las coordenadas relevantes de los landmarks
-        head_center = [landmarks[self.mp_pose.PoseLandmark.NOSE.value].x,
-                       landmarks[self.mp_pose.PoseLandmark.NOSE.value].y,
-                       landmarks[self.mp_pose.PoseLandmark.NOSE.value].z]
-
-        torso_center = [landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                        landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].y,
-                        landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].z]
-
-        upper_arm_center = self.segment_center(
-            [landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].z],
-            [landmarks[self.mp_pose.PoseLandmark.RIGHT_ELBOW.value].x,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_ELBOW.value].y,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_ELBOW.value].z]
-        )
+    # Calcula el centro de masa de muchos frames en una sola operación.
+    # landmarks: array (n_frames, 33, 3); devuelve un array (n_frames, 3)
+    def calculate_center_of_mass_batch(self, landmarks):
+        return center_of_mass_batch(landmarks, self.segment_weights)
 
-        thigh_center = self.segment_center(
-            [landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].y,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].z],
-            [landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE.value].x,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE.value].y,
-             landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE.value].z]
-        )
+    # Detecta la pose; devuelve (landmarks (33, 3), visibilidad (33,)) o None.
+    # Con un RegionTracker, MediaPipe solo recibe la ventana recortada/reducida
+    # y los landmarks se devuelven en coordenadas del frame completo.
+    def detect_landmarks(self, pose, image_np, region=None):
+        if region is not None and region.enabled():
+            input_np, window = region.prepare(image_np)
+            # Si la ventana se movió, la región que sigue el tracker ya no corresponde
+            if region.moved and hasattr(pose, 'reset'):
+                pose.reset()
+            return region.map_back(self._run_pose(pose, input_np), window, image_np.shape)
+        return self._run_pose(pose, image_np)
+
+    def _run_pose(self, pose, image_np):
+        # MediaPipe necesita memoria contigua; los buffers de PyAV pueden tener relleno
+        results = pose.process(np.ascontiguousarray(image_np))
+        if not results.pose_landmarks:
+            return None
+        landmarks = results.pose_landmarks.landmark
+        return landmarks_to_array(landmarks), landmarks_visibility(landmarks)
+
+    # Dibuja el esqueleto a partir de arrays, con el mismo estilo que mp_drawing
+    def draw_skeleton(self, image_np, landmarks, visibility):
+        import cv2
+
+        height, width, _ = image_np.shape
+        inside = ((landmarks[:, 0] >= 0) & (landmarks[:, 0] <= 1) &
+                  (landmarks[:, 1] >= 0) & (landmarks[:, 1] <= 1))
+        drawn = inside & (visibility >= 0.5)
+        px = np.minimum(np.floor(landmarks[:, 0] * width), width - 1).astype(int)
+        py = np.minimum(np.floor(landmarks[:, 1] * height), height - 1).astype(int)
+
+        for start, end in self.pose_connections:
+            if drawn[start] and drawn[end]:
+                cv2.line(image_np, (px[start], py[start]), (px[end], py[end]), (224, 224, 224), 2)
+        for i in np.flatnonzero(drawn):
+            cv2.circle(image_np, (px[i], py[i]), 3, (224, 224, 224), 2)
+            cv2.circle(image_np, (px[i], py[i]), 2, (0, 0, 255), -1)
+
+    # Dibuja el esqueleto y el centro de masa a partir de arrays de landmarks
+    # Si ya se calculó el centro de masa se puede pasar en `com`; `label`
+    # (p. ej. el track ID) se antepone a las coordenadas.
+    def draw_annotations(self, image_np, landmarks, visibility, peso_persona, com=None, label=None):
+        import cv2
+
+        # Dibujar el esqueleto en la imagen
+        self.draw_skeleton(image_np, landmarks, visibility)
+
+        # Calcular el centro de masa
+        if com is None:
+            com = self.calculate_center_of_mass(landmarks, peso_persona)
+        cm_x, cm_y, cm_z = com
+
+        # Dibujar el centro de masa en la imagen
+        height, width, _ = image_np.shape
+        cm_x_px = int(cm_x * width)
+        cm_y_px = int(cm_y * height)
+
+        # Dibujar un círculo rojo en el centro de masa
+        cv2.circle(image_np, (cm_x_px, cm_y_px), 5, (255, 0, 0), -1)
+
+        # Dibujar las coordenadas X, Y, Z junto al punto rojo
+        text = f"X: {cm_x:.2f}, Y: {cm_y:.2f}, Z: {cm_z:.2f}"
+        if label is not None:
+            text = f"{label} | {text}"
+        cv2.putText(image_np, text,
+                    (cm_x_px + 10, cm_y_px - 10), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.5, (255, 255, 255), 1, cv2.LINE_AA)
+
+        return image_np
+
+    # Detecta la pose y dibuja el esqueleto y el centro de masa sobre image_np.
+    # Con un LandmarkFilter en `smoother` la detección se filtra en `timestamp`;
+    # `region` es un RegionTracker opcional, como en detect_landmarks. Si image_np
+    # es de un FrameBufferPool, con `frame_pool` MediaPipe la recibe sin copias nuevas.
+    def annotate_frame(self, pose, image_np, peso_persona, smoother=None, timestamp=None, region=None,
+                       frame_pool=None):
+        source = frame_pool.contiguous(image_np) if frame_pool is not None else image_np
+        detection = self.detect_landmarks(pose, source, region)
+        if smoother is not None:
+            detection = smoother.update(detection, timestamp)
+        if detection is not None:
+            self.draw_annotations(image_np, *detection, peso_persona)
+        return image_np
+
+    # Devuelve (input_path, content_hash, remove_input). Una ruta se usa tal cual,
+    # con el hash ya conocido si se indica en content_hash; un archivo subido se
+    # copia por bloques a un temporal si spool es True, y si no input_path es None
+    # y PyAV lee directamente del objeto de archivo.
+    def _locate_input(self, uploaded_file, spool, content_hash=None):
+        if isinstance(uploaded_file, (str, os.PathLike)):
+            return os.fspath(uploaded_file), content_hash, False
+        if spool:
+            input_path, content_hash = spool_upload_to_file(uploaded_file)
+            return input_path, content_hash, True
+        return None, None, False
+
+    # Busca los landmarks del video en caché; devuelve (cache_key, cached).
+    # El peso no forma parte de la clave porque se cancela en el promedio
+    # ponderado del centro de masa.
+    # Las opciones que cambian los landmarks (p. ej. la resolución de inferencia)
+    # se agregan a la clave en `extra_options`.
+    def _lookup_cache(self, uploaded_file, input_path, content_hash, extra_options=None):
+        if self.landmark_cache is None:
+            return None, None
+        if content_hash is None:
+            content_hash = file_sha256(input_path) if input_path else upload_sha256(uploaded_file)
+        cache_key = self.landmark_cache.make_key(content_hash, dict(self.pose_options, **(extra_options or {})))
+        return cache_key, self.landmark_cache.get(cache_key)
+
+    # Procesa el video y detecta el esqueleto junto con el centro de masa.
+    # Con pipeline=True la decodificación, la detección de pose y la codificación
+    # corren en etapas paralelas unidas por colas de queue_depth frames.
+    # Con parallel=True el video se divide en segmentos que procesan `workers`
+    # procesos; cada segmento calienta el tracker con warmup_seconds previos.
+    # El modo paralelo no admite pipeline, progress_callback, paso de inferencia
+    # ni varias personas (lanza ValueError), y su perfil no tiene etapas.
+    # La entrada se copia por bloques a un archivo temporal; con spool_upload=False
+    # PyAV la demultiplexa directamente desde el objeto de archivo. También se
+    # acepta la ruta de un video en disco. El resultado se escribe en output_path
+    # (o en un temporal) y sus estadísticas quedan en self.last_run.
+    # Con inference_stride > 1 MediaPipe solo corre cada N frames y los demás se
+    # interpolan; adaptive_stride ajusta N (hasta max_stride) según el movimiento.
+    # inference_size limita el lado mayor de la imagen que recibe MediaPipe y con
+    # roi_tracking solo se le pasa una ventana alrededor de la persona.
+    # El perfil por etapa del último video queda en self.last_profile.
+    # progress_callback(index, total, image_np, com) se llama tras anotar cada
+    # frame (com es None si no hubo detección; total es 0 si no se conoce).
+    # encoder_profile elige codec, preset y calidad de la salida (ver classEncoder).
+    # Con smoothing los landmarks pasan por un filtro One-Euro antes de dibujarse;
+    # el caché guarda siempre las detecciones sin filtrar.
+    # Con num_poses > 1 se siguen hasta num_poses personas con PoseLandmarker
+    # (modelo en pose_model); ver _process_video_multi. Ese modo no usa el caché
+    # de landmarks y rechaza (ValueError) las opciones que no admite.
+    # content_hash es el SHA-256 de la entrada si ya se conoce (p. ej. lo calculó
+    # spool_upload), para no volver a leer el archivo al buscar en el caché.
+    def process_video(self, uploaded_file, peso_persona, pipeline=False, queue_depth=8,
+                      parallel=False, workers=None, warmup_seconds=1.0, spool_upload=True,
+                      output_path=None, inference_stride=1, adaptive_stride=False, max_stride=8,
+                      inference_size=None, roi_tracking=False, profile=True, progress_callback=None,
+                      encoder_profile=DEFAULT_ENCODER_PROFILE, smoothing=True, num_poses=1, pose_model=None,
+                      content_hash=None):
+        import av
+        from classFrames import FrameBufferPool
+        from classROI import RegionTracker, region_cache_options
+
+        if parallel:
+            unsupported = [name for name, used in (('pipeline', pipeline),
+                                                   ('progress_callback', progress_callback is not None),
+                                                   ('inference_stride', inference_stride != 1),
+                                                   ('adaptive_stride', adaptive_stride),
+                                                   ('num_poses', num_poses > 1)) if used]
+            if unsupported:
+                raise ValueError(f"parallel=True no admite: {', '.join(unsupported)}")
+
+        if num_poses > 1:
+            self._check_multi_options(pipeline=pipeline, spool_upload=spool_upload,
+                                      inference_stride=inference_stride, adaptive_stride=adaptive_stride,
+                                      inference_size=inference_size, roi_tracking=roi_tracking)
+            return self._process_video_multi(uploaded_file, peso_persona, num_poses, pose_model, output_path,
+                                             encoder_profile, smoothing, profile, progress_callback)
+
+        start_time = time.perf_counter()
+
+        # Ubicar la entrada: ruta en disco, copia temporal o lectura directa
+        input_path, content_hash, remove_input = self._locate_input(uploaded_file, spool_upload or parallel,
+                                                                    content_hash)
+
+        # Crear el archivo temporal de salida si no se indicó uno
+        created_output = output_path is None
+        if created_output:
+            tfile_out = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
+            tfile_out.close()
+            output_path = tfile_out.name
+
+        # Si el procesamiento falla o se cancela (p. ej. JobCancelled desde
+        # progress_callback) se cierran los contenedores y se borran la entrada
+        # temporal y la salida incompleta creada aquí
+        input_container = output_container = None
+        completed = False
+        try:
+            # Buscar los landmarks en caché
+            region = RegionTracker(inference_size, roi_tracking)
+            cache_key, cached = self._lookup_cache(uploaded_file, input_path, content_hash,
+                                                   region_cache_options(region))
+
+            if parallel and cached is None:
+                from classParallel import process_video_parallel
 
-        # Calcular el eje X como el punto medio entre las dos caderas
-        hip_right = [landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                     landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].y,
-                     landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].z]
-
-        hip_left = [landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].z]
-
-        cm_x = (hip_right[0] + hip_left[0]) / 2
-
-        # Centros y masas de los segmentos corporales
-        segment_centers = [
-            (head_center, segment_mass_ratios['head'] * peso_persona),
-            (torso_center, segment_mass_ratios['torso'] * peso_persona),
-            (upper_arm_center, segment_mass_ratios['upper_arm'] * peso_persona),
-            (thigh_center, segment_mass_ratios['thigh'] * peso_persona)
-        ]
-
-        # Calcular el centro de masa en el eje Y y Z, manteniendo el nuevo eje X
-        total_mass = sum(mass for _, mass in segment_centers)
-        cm_y = sum(center[1] * mass for center, mass in segment_centers) / total_mass
-        cm_z = sum(center[2] * mass for center, mass in segment_centers) / total_mass
-
-        return cm_x, cm_y, cm_z
-
-    # Procesa el video y detecta el esqueleto junto con el centro de masa
-    def process_video(self, uploaded_file, peso_persona):
-        # Crear archivos temporales para el video de entrada y salida
-        tfile_in = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
-        tfile_in.write(uploaded_file.read())
-        tfile_in.close()
-
-        tfile_out = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
-        tfile_out.close()
-
-        # Abre el video de entrada usando av
-        input_container = av.open(tfile_in.name)
-        # Prepara el contenedor de salida usando av
-        output_container = av.open(tfile_out.name, mode='w')
-
-        # Obtén el stream de video y su configuración
-        input_stream = input_container.streams.video[0]
-        codec_name = input_stream.codec_context.name
-
-        # Configura el stream de salida
-        output_stream = output_container.add_stream(codec_name, rate=input_stream.average_rate)
-        output_stream.width = input_stream.width
-        output_stream.height = input_stream.height
-        output_stream.pix_fmt = 'yuv420p'
-
-        with self.mp_pose.Pose(min_detection_confidence=0.75, min_tracking_confidence=0.85) as pose:
-            for frame in input_container.decode(video=0):
-                # Convertir el frame a un array de numpy
-                image = frame.to_image()
-                image_np = np.array(image)
-
-                # Procesa la imagen para detectar poses
-                results = pose.process(image_np)
-
-                # Dibujar el esqueleto y el centro de masa en la imagen
-                if results.pose_landmarks:
-                    landmarks = results.pose_landmarks.landmark
-
-                    # Dibujar el esqueleto en la imagen
-                    self.mp_drawing.draw_landmarks(image_np, results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS)
-
-                    # Calcular el centro de masa
-                    cm_x, cm_y, cm_z = self.calculate_center_of_mass(landmarks, peso_persona)
-
-                    # Dibujar el centro de masa en la imagen
-                    height, width, _ = image_np.shape
-                    cm_x_px = int(cm_x * width)
-                    cm_y_px = int(cm_y * height)
-
-                    # Dibujar un círculo rojo en el centro de masa
-                    cv2.circle(image_np, (cm_x_px, cm_y_px), 5, (255, 0, 0), -1)
-
-                    # Dibujar las coordenadas X, Y, Z junto al punto rojo
-                    cv2.putText(image_np, f"X: {cm_x:.2f}, Y: {cm_y:.2f}, Z: {cm_z:.2f}",
-                                (cm_x_px + 10, cm_y_px - 10), cv2.FONT_HERSHEY_SIMPLEX,
-                                0.5, (255, 255, 255), 1, cv2.LINE_AA)
-
-                # Convertir el frame procesado a AV frame
-                processed_frame = av.VideoFrame.from_ndarray(image_np, format='rgb24')
-                for packet in output_stream.encode(processed_frame):
+                # Los segmentos se perfilan en otros procesos: aquí solo frames/s y memoria
+                profiler = StageProfiler(enabled=profile)
+                frames = process_video_parallel(input_path, output_path, peso_persona, workers, warmup_seconds,
+                                                encoder_profile, self.segment_model, smoothing,
+                                                inference_size, roi_tracking)
+                profiler.frames = frames
+                self._store_profile(profiler)
+                self._record_run(frames, start_time, inferred_frames=frames, encoder_profile=encoder_profile,
+                                 encoder=select_encoder(encoder_profile)[0], encode_fps=None,
+                                 output_bytes=os.path.getsize(output_path))
+                completed = True
+                return output_path
+
+            # Abre el video de entrada usando av
+            input_container = av.open(input_path if input_path else uploaded_file)
+            # Prepara el contenedor de salida usando av
+            output_container = av.open(output_path, mode='w')
+
+            # Obtén el stream de video y su configuración
+            input_stream = input_container.streams.video[0]
+
+            # Configura el stream de salida con el primer codec disponible del perfil
+            output_stream = add_output_stream(output_container, input_stream.width, input_stream.height,
+                                              input_stream.average_rate, encoder_profile)
+
+            # Detección por frame: desde el caché o con MediaPipe cada inference_stride
+            # frames (o con paso adaptativo), interpolando los frames intermedios
+            strided = StridedDetector(inference_stride, adaptive_stride, max_stride,
+                                      segment_weights=self.segment_weights)
+
+            # Los frames se decodifican en buffers RGB preasignados; hacen falta tantos
+            # como frames puedan estar en vuelo entre las colas o retenidos por el paso
+            buffer_count = (2 * queue_depth + 3 if pipeline else 1) + strided.max_delay()
+            frame_pool = FrameBufferPool(input_stream.width, input_stream.height, buffer_count)
+            self.frame_stats = frame_pool.stats
+
+            # Cantidad de frames según el contenedor, para la barra de progreso
+            total_frames = input_stream.frames
+            if not total_frames and input_stream.duration and input_stream.average_rate:
+                total_frames = int(input_stream.duration * input_stream.time_base * input_stream.average_rate)
+
+            # Latencia por etapa; clock/record cuestan poco y quedan activos siempre
+            profiler = StageProfiler(enabled=profile)
+
+            # Filtro temporal de landmarks; el tiempo de cada frame sale de su índice
+            smoother = LandmarkFilter() if smoothing else None
+            frame_rate = float(input_stream.average_rate or 30)
+
+            def decode_frames():
+                frames = input_container.decode(video=0)
+                while True:
+                    start = profiler.clock()
+                    frame = next(frames, None)
+                    if frame is None:
+                        return
+                    profiler.record('decode', start)
+
+                    start = profiler.clock()
+                    buffer = frame_pool.load(frame)
+                    profiler.record('convert', start)
+                    yield buffer
+
+            # El buffer ya es un AV frame: se codifica sin volver a convertirlo
+            def encode_frame(buffer):
+                start = profiler.clock()
+                packets = output_stream.encode(buffer.frame)
+                profiler.record('encode', start)
+
+                start = profiler.clock()
+                for packet in packets:
+                    output_container.mux(packet)
+                profiler.record('mux', start)
+                profiler.frame()
+
+            # Landmarks de cada frame, para guardarlos en caché al terminar
+            detections = []
+
+            # Con caché no se necesita MediaPipe: solo se recalcula el CM y se dibuja
+            if cached is not None:
+                pose_context = contextlib.nullcontext()
+            else:
+                pose_context = self.pose_session()
+
+            with pose_context as pose:
+                def detect(buffer):
+                    start = profiler.clock()
+                    detection = self.detect_landmarks(pose, frame_pool.contiguous(buffer.array), region)
+                    profiler.record('pose', start)
+                    return detection
+
+                def detection_stream(buffers):
+                    if cached is None:
+                        yield from strided.run(buffers, detect)
+                        return
+                    landmarks, visibility, detected = cached
+                    for index, buffer in enumerate(buffers):
+                        if index < len(detected) and detected[index]:
+                            yield buffer, (landmarks[index], visibility[index])
+                        else:
+                            yield buffer, None
+
+                # Se dibuja en todos los frames, también en los interpolados
+                def annotate_stream(buffers):
+                    for buffer, detection in detection_stream(buffers):
+                        detections.append(detection)
+                        if smoother is not None:
+                            start = profiler.clock()
+                            detection = smoother.update(detection, (len(detections) - 1) / frame_rate)
+                            profiler.record('filter', start)
+
+                        if detection is not None:
+                            start = profiler.clock()
+                            com = self.calculate_center_of_mass(detection[0], peso_persona)
+                            profiler.record('com', start)
+
+                            start = profiler.clock()
+                            self.draw_annotations(buffer.array, *detection, peso_persona, com=com)
+                            profiler.record('draw', start)
+                        else:
+                            com = None
+
+                        if progress_callback is not None:
+                            progress_callback(len(detections) - 1, total_frames, buffer.array, com)
+                        yield buffer
+
+                if pipeline:
+                    FramePipeline(queue_depth).run_stream(decode_frames(), annotate_stream, encode_frame)
+                else:
+                    for buffer in annotate_stream(decode_frames()):
+                        encode_frame(buffer)
+
+                # Finalizar el stream de salida
+                for packet in output_stream.encode():
                     output_container.mux(packet)
 
-            # Finalizar el stream de salida
-            for packet in output_stream.encode():
-                output_container.mux(packet)
+                # Cerrar los contenedores
+                output_container.close()
+                input_container.close()
+
+            # Solo se guardan en caché landmarks inferidos en todos los frames
+            if cache_key is not None and cached is None and strided.inferred == strided.frames:
+                self.landmark_cache.put(cache_key, *stack_detections(detections))
+
+            inferred = len(detections) if cached is not None else strided.inferred
+            self._store_profile(profiler)
+
+            # Frames/s del codificador solo, para comparar perfiles de codificación
+            encode_stats = self.last_profile['stages'].get('encode')
+            encode_fps = None
+            if encode_stats and encode_stats['total_s'] > 0:
+                encode_fps = encode_stats['count'] / encode_stats['total_s']
+            self._record_run(len(detections), start_time, inferred_frames=inferred, encoder_profile=encoder_profile,
+                             encoder=output_stream.codec_context.name, encode_fps=encode_fps,
+                             output_bytes=os.path.getsize(output_path))
+            completed = True
+            return output_path
+        finally:
+            for container in (output_container, input_container):
+                if container is not None:
+                    container.close()
+            if remove_input:
+                os.remove(input_path)
+            if created_output and not completed and os.path.exists(output_path):
+                os.remove(output_path)
+
+    # Lanza ValueError si se pidió alguna opción que el modo varias personas no
+    # admite, en lugar de ignorarla en silencio (max_stride solo importa con
+    # adaptive_stride, que ya se rechaza).
+    @staticmethod
+    def _check_multi_options(pipeline=False, spool_upload=True, inference_stride=1, adaptive_stride=False,
+                             max_stride=8, inference_size=None, roi_tracking=False):
+        unsupported = [name for name, used in (('pipeline', pipeline),
+                                               ('spool_upload=False', not spool_upload),
+                                               ('inference_stride', inference_stride != 1),
+                                               ('adaptive_stride', adaptive_stride),
+                                               ('inference_size', inference_size is not None),
+                                               ('roi_tracking', roi_tracking)) if used]
+        if unsupported:
+            raise ValueError(f"num_poses > 1 no admite: {', '.join(unsupported)}")
+
+    # Modo varias personas: cada frame pasa una sola vez por PoseLandmarker, que
+    # detecta a todas las personas; el tracker les asigna IDs estables, cada track
+    # tiene su propio filtro y el CM de todas se calcula en una sola operación.
+    # No usa caché, paso de inferencia, ventana de inferencia ni pipeline.
+    def _process_video_multi(self, uploaded_file, peso_persona, num_poses, pose_model=None, output_path=None,
+                             encoder_profile=DEFAULT_ENCODER_PROFILE, smoothing=True, profile=True,
+                             progress_callback=None):
+        import av
+
+        start_time = time.perf_counter()
+        input_path, _, remove_input = self._locate_input(uploaded_file, True)
+        created_output = output_path is None
+        if created_output:
+            tfile_out = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
+            tfile_out.close()
+            output_path = tfile_out.name
+
+        profiler = StageProfiler(enabled=profile)
+        tracks = set()
+        frames = 0
+        completed = False
+        try:
+            with av.open(input_path) as input_container, av.open(output_path, mode='w') as output_container:
+                input_stream = input_container.streams.video[0]
+                output_stream = add_output_stream(output_container, input_stream.width, input_stream.height,
+                                                  input_stream.average_rate, encoder_profile)
+                total_frames = input_stream.frames
 
-            # Cerrar los contenedores
-            output_container.close()
-            input_container.close()
+                for index, _, buffer, track_ids, landmarks, visibility, com in self._iter_tracks(
+                        input_container, num_poses, pose_model, smoothing, profiler):
+                    start = profiler.clock()
+                    for k, track_id in enumerate(track_ids):
+                        self.draw_annotations(buffer.array, landmarks[k], visibility[k], peso_persona,
+                                              com=tuple(com[k]), label=f"ID {track_id}")
+                    profiler.record('draw', start)
+                    tracks.update(track_ids)
 
-        # Eliminar el archivo de entrada temporal
-        os.remove(tfile_in.name)
+                    if progress_callback is not None:
+                        progress_callback(index, total_frames, buffer.array, tuple(com[0]) if len(com) else None)
 
-        return tfile_out.name
+                    start = profiler.clock()
+                    for packet in output_stream.encode(buffer.frame):
+                        output_container.mux(packet)
+                    profiler.record('encode', start)
+                    profiler.frame()
+                    frames += 1
+
+                for packet in output_stream.encode():
+                    output_container.mux(packet)
+            completed = True
+        finally:
+            if remove_input:
+                os.remove(input_path)
+            if created_output and not completed and os.path.exists(output_path):
+                os.remove(output_path)
+
+        self._store_profile(profiler)
+        self._record_run(frames, start_time, tracks=len(tracks), encoder_profile=encoder_profile,
+                         encoder=select_encoder(encoder_profile)[0], output_bytes=os.path.getsize(output_path))
+        return output_path
+
+    # Genera (índice, tiempo, buffer, track_ids, landmarks, visibilidad, CM) por
+    # frame con todas las personas detectadas; landmarks (n, 33, 3) y CM (n, 3) siguen el
+    # orden de track_ids
+    def _iter_tracks(self, container, num_poses, pose_model=None, smoothing=True, profiler=None):
+        from classFrames import FrameBufferPool
+        from classMultiPose import MultiPoseDetector, PoseTracker
+
+        profiler = profiler or StageProfiler(enabled=False)
+        stream = container.streams.video[0]
+        rate = float(stream.average_rate or 30)
+        frame_pool = FrameBufferPool(stream.width, stream.height)
+        tracker = PoseTracker()
+        smoothers = {}
+
+        with MultiPoseDetector(pose_model, num_poses, **self.pose_options) as multi_pose:
+            for index, frame in enumerate(container.decode(stream)):
+                timestamp = frame.time if frame.time is not None else index / rate
+                buffer = frame_pool.load(frame)
+
+                start = profiler.clock()
+                landmarks, visibility = multi_pose.detect(frame_pool.contiguous(buffer.array), timestamp)
+                profiler.record('pose', start)
+
+                start = profiler.clock()
+                track_ids = tracker.update(landmarks)
+                if smoothing:
+                    for k, track_id in enumerate(track_ids):
+                        smoother = smoothers.setdefault(track_id, LandmarkFilter())
+                        landmarks[k], visibility[k] = smoother.update((landmarks[k], visibility[k]), timestamp)
+                    for track_id in set(smoothers) - set(tracker.tracks):
+                        del smoothers[track_id]
+                profiler.record('track', start)
+
+                start = profiler.clock()
+                com = center_of_mass_batch(landmarks, self.segment_weights)
+                profiler.record('com', start)
+                yield index, timestamp, buffer, track_ids, landmarks, visibility, com
+
+    # Modo en vivo: procesa una cámara, una URL RTSP, un pipe o un archivo
+    # reproducido a velocidad real (ver classLive.open_live_source).
+    # Siempre se procesa el frame más reciente y los que llegan mientras MediaPipe
+    # trabaja se descartan, así la latencia no crece aunque la inferencia se atrase.
+    # frame_callback(index, image_np, com, latency_ms) recibe cada frame anotado,
+    # su CM (o None) y la latencia desde que el frame estuvo disponible. Si se
+    # indica output_path los frames anotados también se graban.
+    # Con realtime=False un archivo se lee sin pausas y sin descartar frames.
+    # Termina al agotarse la fuente, tras max_frames frames o duration segundos;
+    # las estadísticas (frames descartados, latencia p50/p95/máx) quedan en self.last_run.
+    def process_live(self, source, peso_persona, frame_callback=None, max_frames=None, duration=None,
+                     realtime=None, inference_size=None, smoothing=True, output_path=None,
+                     encoder_profile='preview'):
+        from classFrames import FrameBufferPool
+        from classLive import LatestFrameReader, open_live_source
+        from classROI import RegionTracker
+
+        start_time = time.perf_counter()
+        container, is_file = open_live_source(source)
+
+        # La fuente se cierra en el finally aunque falle la apertura de la salida
+        output_container = output_stream = last_pts = None
+        try:
+            realtime = is_file if realtime is None else realtime
+            stream = container.streams.video[0]
+            frame_rate = Fraction(stream.average_rate or 30)
+            frame_pool = FrameBufferPool(stream.width, stream.height)
+            region = RegionTracker(inference_size)
+            smoother = LandmarkFilter() if smoothing else None
+            profiler = StageProfiler()
+            latencies = []
+
+            if output_path is not None:
+                import av
+
+                output_container = av.open(output_path, mode='w')
+                output_stream = add_output_stream(output_container, stream.width, stream.height,
+                                                  frame_rate, encoder_profile)
+
+            drop_frames = realtime or not is_file
+            with LatestFrameReader(container, realtime, drop_frames) as reader, self.pose_session() as pose:
+                while max_frames is None or len(latencies) < max_frames:
+                    if duration is not None and time.perf_counter() - start_time >= duration:
+                        break
+                    item = reader.next()
+                    if item is None:
+                        break
+                    frame, arrival_ns = item
+                    timestamp = frame.time if frame.time is not None else arrival_ns / 1e9
+
+                    buffer = frame_pool.load(frame)
+                    start = profiler.clock()
+                    detection = self.detect_landmarks(pose, frame_pool.contiguous(buffer.array), region)
+                    profiler.record('pose', start)
+                    if smoother is not None:
+                        detection = smoother.update(detection, timestamp)
+
+                    com = None
+                    if detection is not None:
+                        com = self.calculate_center_of_mass(detection[0], peso_persona)
+                        self.draw_annotations(buffer.array, *detection, peso_persona, com=com)
+
+                    # Latencia de extremo a extremo: de la llegada del frame a la salida anotada
+                    profiler.record('latency', arrival_ns)
+                    latency_ms = (time.perf_counter_ns() - arrival_ns) / 1e6
+                    latencies.append(latency_ms)
+                    profiler.frame()
+
+                    if frame_callback is not None:
+                        frame_callback(len(latencies) - 1, buffer.array, com, latency_ms)
+                    if output_stream is not None:
+                        # pts según el momento de llegada: los frames descartados
+                        # quedan como huecos y la grabación conserva el ritmo real
+                        pts = round((arrival_ns / 1e9 - start_time) * frame_rate)
+                        last_pts = buffer.frame.pts = pts if last_pts is None else max(pts, last_pts + 1)
+                        buffer.frame.time_base = 1 / frame_rate
+                        for packet in output_stream.encode(buffer.frame):
+                            output_container.mux(packet)
+                read_frames, dropped = reader.frames, reader.dropped
+        finally:
+            try:
+                if output_container is not None:
+                    try:
+                        if output_stream is not None:
+                            for packet in output_stream.encode():
+                                output_container.mux(packet)
+                    finally:
+                        output_container.close()
+            finally:
+                container.close()
+
+        self._store_profile(profiler)
+        latency = np.array(latencies) if latencies else np.zeros(1)
+        self._record_run(len(latencies), start_time, source_frames=read_frames, dropped_frames=dropped,
+                         latency_p50_ms=float(np.percentile(latency, 50)),
+                         latency_p95_ms=float(np.percentile(latency, 95)),
+                         latency_max_ms=float(latency.max()))
+        return self.last_run
+
+    # Guarda el perfil del último video, con las métricas del pool de grafos si hay uno
+    def _store_profile(self, profiler):
+        self.last_profile = profiler.report()
+        if self.pose_pool is not None:
+            self.last_profile['pose_pool'] = self.pose_pool.report()
+
+    # Guarda frames, tiempo y frames por segundo del último video procesado
+    def _record_run(self, frames, start_time, **extra):
+        seconds = time.perf_counter() - start_time
+        self.last_run = dict({
+            'frames': frames,
+            'seconds': seconds,
+            'fps': frames / seconds if seconds > 0 else 0.0,
+        }, **extra)
+
+    # Tiempo en segundos de cada frame a partir de los paquetes, sin decodificar
+    def _frame_times(self, container, stream, n_frames):
+        pts = sorted(packet.pts for packet in container.demux(stream) if packet.pts is not None)
+        times = [float(p * stream.time_base) for p in pts[:n_frames]]
+        rate = float(stream.average_rate or 30)
+        times.extend(i / rate for i in range(len(times), n_frames))
+        return times
+
+    # Genera (tiempo, detección) por frame, sin dibujar ni codificar nada.
+    # Si los landmarks están en caché no se decodifica ni se usa MediaPipe.
+    # El paso de inferencia y la ventana de inferencia funcionan igual que en process_video.
+    def _iter_detections(self, uploaded_file, spool_upload=True, inference_stride=1,
+                         adaptive_stride=False, max_stride=8, inference_size=None,
+                         roi_tracking=False, use_cache=True):
+        import av
+        from classFrames import FrameBufferPool
+        from classROI import RegionTracker, region_cache_options
+
+        region = RegionTracker(inference_size, roi_tracking)
+        input_path, content_hash, remove_input = self._locate_input(uploaded_file, spool_upload)
+        try:
+            cache_key, cached = None, None
+            if use_cache:
+                cache_key, cached = self._lookup_cache(uploaded_file, input_path, content_hash,
+                                                       region_cache_options(region))
+            container = av.open(input_path if input_path else uploaded_file)
+            stream = container.streams.video[0]
+            try:
+                if cached is not None:
+                    landmarks, visibility, detected = cached
+                    times = self._frame_times(container, stream, len(detected))
+                    for index, timestamp in enumerate(times):
+                        yield timestamp, (landmarks[index], visibility[index]) if detected[index] else None
+                    return
+
+                strided = StridedDetector(inference_stride, adaptive_stride, max_stride,
+                                          segment_weights=self.segment_weights)
+                rate = float(stream.average_rate or 30)
+                frame_pool = FrameBufferPool(stream.width, stream.height, 1 + strided.max_delay())
+
+                def decode_frames():
+                    for index, frame in enumerate(container.decode(stream)):
+                        timestamp = frame.time if frame.time is not None else index / rate
+                        yield timestamp, frame_pool.load(frame)
+
+                detections = []
+                with self.pose_session() as pose:
+                    def detect(item):
+                        return self.detect_landmarks(pose, frame_pool.contiguous(item[1].array), region)
+
+                    for (timestamp, _), detection in strided.run(decode_frames(), detect):
+                        detections.append(detection)
+                        yield timestamp, detection
+
+                self.last_inferred_frames = strided.inferred
+                if cache_key is not None and strided.inferred == strided.frames:
+                    self.landmark_cache.put(cache_key, *stack_detections(detections))
+            finally:
+                container.close()
+        finally:
+            if remove_input:
+                os.remove(input_path)
+
+    # Aplica el filtro temporal a una secuencia de (tiempo, detección)
+    def _smooth_detections(self, detections):
+        smoother = LandmarkFilter()
+        for timestamp, detection in detections:
+            yield timestamp, smoother.update(detection, timestamp)
+
+    # Modo solo análisis: genera una fila por frame con tiempo, CM X/Y/Z y la
+    # visibilidad de cada landmark. Los frames sin persona tienen CM NaN.
+    # Con smoothing=True los landmarks pasan por el filtro temporal.
+    def iter_com_series(self, uploaded_file, spool_upload=True, smoothing=False, **stride_options):
+        detections = self._iter_detections(uploaded_file, spool_upload, **stride_options)
+        if smoothing:
+            detections = self._smooth_detections(detections)
+        for index, (timestamp, detection) in enumerate(detections):
+            if detection is not None:
+                landmarks, visibility = detection
+                cm_x, cm_y, cm_z = center_of_mass_batch(landmarks[np.newaxis], self.segment_weights)[0]
+            else:
+                visibility = np.zeros(NUM_LANDMARKS, dtype=np.float32)
+                cm_x = cm_y = cm_z = np.nan
+            yield {
+                'frame': index,
+                'time': timestamp,
+                'detected': detection is not None,
+                'com_x': float(cm_x),
+                'com_y': float(cm_y),
+                'com_z': float(cm_z),
+                'visibility': visibility,
+            }
+
+    # Modo solo análisis: escribe la serie de tiempo del CM en Parquet (o .npz si
+    # no hay pyarrow) sin dibujar ni volver a codificar el video.
+    # Devuelve la ruta escrita; las estadísticas quedan en self.last_run.
+    # Con num_poses > 1 hay una fila por persona y frame, con su track_id.
+    def export_com_series(self, uploaded_file, output_path, spool_upload=True, smoothing=False,
+                          num_poses=1, pose_model=None, **stride_options):
+        if num_poses > 1:
+            self._check_multi_options(spool_upload=spool_upload, **stride_options)
+            return self._export_com_series_multi(uploaded_file, output_path, num_poses, pose_model, smoothing)
+
+        start_time = time.perf_counter()
+        times = []
+        detections = []
+        stream = self._iter_detections(uploaded_file, spool_upload, **stride_options)
+        if smoothing:
+            stream = self._smooth_detections(stream)
+        for timestamp, detection in stream:
+            times.append(timestamp)
+            detections.append(detection)
+
+        landmarks, visibility, detected = stack_detections(detections)
+        com = center_of_mass_batch(landmarks, self.segment_weights)
+        com[~detected] = np.nan
+
+        output_path = write_com_series(output_path, com_series_columns(times, com, visibility, detected))
+        self._record_run(len(detections), start_time)
+        return output_path
+
+    # Serie de tiempo del CM de cada persona, identificada por su track_id
+    def _export_com_series_multi(self, uploaded_file, output_path, num_poses, pose_model=None, smoothing=False):
+        import av
+
+        start_time = time.perf_counter()
+        input_path, _, remove_input = self._locate_input(uploaded_file, True)
+        frames, times, track_column, com_rows, visibility_rows = [], [], [], [], []
+        n_frames = 0
+        try:
+            with av.open(input_path) as container:
+                for index, timestamp, _, track_ids, _, visibility, com in self._iter_tracks(
+                        container, num_poses, pose_model, smoothing):
+                    n_frames += 1
+                    frames.extend([index] * len(track_ids))
+                    times.extend([timestamp] * len(track_ids))
+                    track_column.extend(track_ids)
+                    com_rows.append(com)
+                    visibility_rows.append(visibility)
+        finally:
+            if remove_input:
+                os.remove(input_path)
+
+        com = np.concatenate(com_rows) if com_rows else np.zeros((0, 3))
+        visibility = np.concatenate(visibility_rows) if visibility_rows else np.zeros((0, NUM_LANDMARKS))
+        columns = com_series_columns(times, com, visibility, np.ones(len(frames), dtype=bool),
+                                     frames=frames, track_ids=track_column)
+        output_path = write_com_series(output_path, columns)
+        self._record_run(n_frames, start_time, tracks=len(set(track_column)))
+        return output_path
+
+    # Compara el CM con paso de inferencia contra la inferencia en todos los frames.
+    # Devuelve errores (en coordenadas normalizadas) y tiempos de ambos modos.
+    def stride_accuracy_report(self, uploaded_file, inference_stride=2, adaptive_stride=False, max_stride=8):
+        input_path, _, remove_input = self._locate_input(uploaded_file, True)
+        try:
+            runs = {}
+            for name, options in (('full', {}), ('strided', dict(inference_stride=inference_stride,
+                                                                 adaptive_stride=adaptive_stride,
+                                                                 max_stride=max_stride))):
+                start_time = time.perf_counter()
+                detections = [d for _, d in self._iter_detections(input_path, use_cache=False, **options)]
+                seconds = time.perf_counter() - start_time
+                runs[name] = (stack_detections(detections), seconds, self.last_inferred_frames)
+        finally:
+            if remove_input:
+                os.remove(input_path)
+
+        (full_landmarks, _, full_detected), full_seconds, _ = runs['full']
+        (strided_landmarks, _, strided_detected), strided_seconds, inferred = runs['strided']
+        both = full_detected & strided_detected
+        errors = np.linalg.norm(center_of_mass_batch(full_landmarks[both], self.segment_weights) -
+                                center_of_mass_batch(strided_landmarks[both], self.segment_weights), axis=1)
+
+        return {
+            'frames': int(len(full_detected)),
+            'inferred_frames': int(inferred),
+            'compared_frames': int(both.sum()),
+            'mean_error': float(errors.mean()) if errors.size else 0.0,
+            'p95_error': float(np.percentile(errors, 95)) if errors.size else 0.0,
+            'max_error': float(errors.max()) if errors.size else 0.0,
+            'full_seconds': full_seconds,
+            'strided_seconds': strided_seconds,
+            'speedup': full_seconds / strided_seconds if strided_seconds > 0 else 0.0,
+        }
+
+# Nombres de los perfiles de codificación en la interfaz
+ENCODER_PROFILE_LABELS = {
+    'preview': "Vista rápida (codifica más rápido, archivo más grande)",
+    'analysis': "Análisis (alta calidad)",
+    'archival': "Archivo (más compacto, codifica más lento)",
+}
 
 class AppFrontend:
-    def __init__(self, detector):
+    def __init__(self, detector, job_manager=None):
+        # Streamlit se importa aquí para que el detector se pueda usar sin él (batch.py)
+        import streamlit as st
+
         self.detector = detector
+        self.job_manager = job_manager
         self.st = st
 
     def run_page_1(self):
         self.st.title("Detección del Centro de Masa")
         uploaded_file = self.st.file_uploader("Sube un video", type=['mp4', 'mov', 'avi'])
+        mostrar_perfil = False
         if uploaded_file is not None:
             peso_persona = self.st.number_input("Ingresa el peso de la persona (kg):", min_value=0.0, step=0.1)
             if peso_persona > 0:
+                calidad = self.st.selectbox("Calidad del video de salida", list(ENCODER_PROFILES),
+                                            index=list(ENCODER_PROFILES).index(DEFAULT_ENCODER_PROFILE),
+                                            format_func=ENCODER_PROFILE_LABELS.get)
+                # El modo varias personas solo se ofrece si está el modelo de PoseLandmarker
+                personas = 1
+                if os.path.exists(DEFAULT_POSE_MODEL):
+                    personas = int(self.st.number_input("Personas a seguir", min_value=1, max_value=6, value=1))
+                mostrar_perfil = self.st.checkbox("Mostrar perfil de rendimiento")
                 if self.st.button("Procesar Video"):
-                    with st.spinner("Procesando video..."):
-                        processed_video_path = self.detector.process_video(uploaded_file, peso_persona)
-                    self.st.success("Procesamiento completado.")
+                    if self.job_manager is not None:
+                        # El video se procesa en segundo plano; el id sobrevive a los reruns
+                        try:
+                            self.st.session_state['job_id'] = self.job_manager.submit(
+                                self.session_user_id(), uploaded_file, peso_persona, encoder_profile=calidad,
+                                num_poses=personas)
+                        except JobLimitExceeded as exc:
+                            self.st.warning(str(exc))
+                    else:
+                        from classPreview import ThrottledPreview
 
-                    # Leer el video procesado
-                    with open(processed_video_path, 'rb') as video_file:
-                        video_bytes = video_file.read()
+                        # Vista previa, progreso y gráfico del CM mientras se procesa
+                        preview = ThrottledPreview(self.st)
+                        processed_video_path = self.detector.process_video(uploaded_file, peso_persona,
+                                                                           progress_callback=preview,
+                                                                           encoder_profile=calidad,
+                                                                           num_poses=personas)
+                        preview.finish()
+                        self.show_result(processed_video_path, self.detector.last_profile if mostrar_perfil else None)
 
-                    # Mostrar el video procesado
-                    self.st.video(video_bytes)
+        if self.job_manager is not None and 'job_id' in self.st.session_state:
+            self.show_job(self.st.session_state['job_id'], mostrar_perfil)
 
-                    # Agregar botón de descarga
-                    self.st.download_button(
-                        label="Descargar Video Procesado",
-                        data=video_bytes,
-                        file_name="video_procesado.mp4",
-                        mime="video/mp4"
-                    )
+    # Identificador de la sesión de Streamlit, para limitar trabajos por usuario
+    def session_user_id(self):
+        if 'user_id' not in self.st.session_state:
+            self.st.session_state['user_id'] = uuid.uuid4().hex
+        return self.st.session_state['user_id']
 
-                    # Eliminar el archivo de video procesado después de usarlo
-                    os.remove(processed_video_path)
+    # Estado de un trabajo en segundo plano; mientras corre, la página se
+    # vuelve a ejecutar cada segundo para actualizar el progreso
+    def show_job(self, job_id, mostrar_perfil=False):
+        job = self.job_manager.get(job_id)
+        if job is None:
+            del self.st.session_state['job_id']
+            return
+
+        if job.status in ACTIVE_STATES:
+            done, total = job.progress
+            if job.status == QUEUED:
+                self.st.progress(0.0, text="En cola...")
+            elif total:
+                self.st.progress(min(done / total, 1.0), text=f"Procesando video... {done}/{total} frames")
+            else:
+                self.st.progress(0.0, text=f"Procesando video... {done} frames")
+            if job.preview is not None:
+                self.st.image(job.preview, channels='RGB')
+            if job.com_rows:
+                import pandas as pd
+
+                step = max(1, math.ceil(len(job.com_rows) / 2000))
+                self.st.line_chart(pd.DataFrame(job.com_rows[::step], columns=['frame', 'com_x', 'com_y'])
+                                   .set_index('frame'))
+            if self.st.button("Cancelar"):
+                self.job_manager.cancel(job_id)
+            time.sleep(1.0)
+            self.st.rerun()
+        elif job.status == DONE:
+            self.show_result(job.result, job.profile if mostrar_perfil else None)
+            self.job_manager.remove(job_id)
+            del self.st.session_state['job_id']
+        else:
+            if job.status == CANCELLED:
+                self.st.info("Procesamiento cancelado.")
+            else:
+                self.st.error(f"Error al procesar el video: {job.error}")
+            self.job_manager.remove(job_id)
+            del self.st.session_state['job_id']
+
+    # Muestra y ofrece descargar el video procesado, y luego lo elimina
+    def show_result(self, processed_video_path, profile=None):
+        self.st.success("Procesamiento completado.")
+
+        if profile is not None:
+            self.show_profile(profile)
+
+        # Leer el video procesado una sola vez: st.video y download_button
+        # comparten los mismos bytes (Streamlit guarda en memoria lo que sirve)
+        with open(processed_video_path, 'rb') as video_file:
+            video_bytes = video_file.read()
+
+        # Eliminar el archivo de video procesado después de leerlo
+        os.remove(processed_video_path)
+
+        # Mostrar el video procesado
+        self.st.video(video_bytes)
+
+        # Agregar botón de descarga
+        self.st.download_button(
+            label="Descargar Video Procesado",
+            data=video_bytes,
+            file_name="video_procesado.mp4",
+            mime="video/mp4"
+        )
+
+    # Panel con el perfil del último video: frames/s, memoria y latencia por etapa
+    def show_profile(self, profile):
+        with self.st.expander("Perfil de rendimiento", expanded=True):
+            col_fps, col_time, col_mem = self.st.columns(3)
+            col_fps.metric("Frames/s", f"{profile['fps']:.1f}")
+            col_time.metric("Tiempo total (s)", f"{profile['wall_s']:.1f}")
+            if profile['peak_rss_mb'] is not None:
+                col_mem.metric("Memoria máxima (MB)", f"{profile['peak_rss_mb']:.0f}")
+            if 'pose_pool' in profile:
+                pool = profile['pose_pool']
+                self.st.caption(f"Grafos de Pose: {pool['hits']} reutilizados, {pool['misses']} creados "
+                                f"(acierto {pool['hit_rate']:.0%}), calentamiento {pool['warmup_seconds']:.1f} s")
+
+            self.st.table([
+                {'Etapa': name, 'Media (ms)': round(stats['mean_ms'], 2), 'p95 (ms)': round(stats['p95_ms'], 2),
+                 'Máx (ms)': round(stats['max_ms'], 2), 'Total (s)': round(stats['total_s'], 2)}
+                for name, stats in profile['stages'].items()
+            ])
+            self.st.download_button(
+                label="Descargar perfil (JSON)",
+                data=json.dumps(profile, indent=2),
+                file_name="perfil.json",
+                mime="application/json"
+            )
 
     def run_page_2(self):
         self.st.title("Cálculo del Centro de Masa")
@@ -223,12 +1039,19 @@ class AppFrontend:
         que se utilizan para calcular el centro de masa ponderado:
         """)
         self.st.write("""
-        - **Cabeza**: 8% de la masa total.
-        - **Torso**: 50% de la masa total.
-        - **Brazo superior**: 3% de la masa total (por cada brazo).
-        - **Antebrazo**: 2% de la masa total (por cada antebrazo).
+        - **Cabeza y cuello**: 8.1% de la masa total.
+        - **Tronco**: 49.7% de la masa total.
+        - **Brazo superior**: 2.8% de la masa total (por cada brazo).
+        - **Antebrazo**: 1.6% de la masa total (por cada antebrazo).
+        - **Mano**: 0.6% de la masa total (por cada mano).
         - **Muslo**: 10% de la masa total (por cada muslo).
-        - **Pierna inferior**: 5% de la masa total (por cada pierna).
+        - **Pierna inferior**: 4.65% de la masa total (por cada pierna).
+        - **Pie**: 1.45% de la masa total (por cada pie).
+        """)
+        self.st.write("""
+        Se usan los segmentos de ambos lados del cuerpo. El centro de cada segmento se ubica entre sus 
+        extremos (por ejemplo, del hombro al codo) según la proporción que indica el modelo. También está 
+        disponible el modelo de **de Leva (1996)**, que ajusta los parámetros de Zatsiorsky-Seluyanov.
         """)
 
         # Ilustración del Cálculo
@@ -287,10 +1110,16 @@ class AppFrontend:
 
 def main():
     # Instancia la clase detectora de centro de masa
-    detector = CenterOfMassDetector()
+    # El pool compartido calienta un grafo con las opciones por defecto al crearse
+    pose_pool = shared_pose_pool(warm_options=DEFAULT_POSE_OPTIONS)
+    detector = CenterOfMassDetector(landmark_cache=LandmarkCache(), pose_pool=pose_pool)
+
+    # Cola de trabajos compartida por todas las sesiones; cada trabajo usa su propio detector
+    job_manager = shared_job_manager(
+        lambda: CenterOfMassDetector(landmark_cache=LandmarkCache(), pose_pool=pose_pool))
 
     # Instancia la clase de frontend
-    frontend = AppFrontend(detector)
+    frontend = AppFrontend(detector, job_manager)
 
     # Crea una barra lateral con un selector de páginas
     page = frontend.st.sidebar.selectbox(